@@ -1,42 +1,271 @@
+import asyncio
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr
-from .const import DOMAIN
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+from .const import (
+    DOMAIN,
+    CONF_MAX_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    CONF_RATE_LIMIT,
+    DEFAULT_RATE_LIMIT,
+    CONF_PUSH_UPDATES,
+    CONF_POLL_INTERVAL,
+    POLL_MIN_INTERVAL,
+    SERVICE_SET_LIGHTS,
+    SERVICE_START_CAPTURE,
+    SERVICE_STOP_CAPTURE,
+    ATTR_NODE_IDS,
+    ATTR_ANONYMIZE,
+    STORAGE_VERSION,
+    STORAGE_KEY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    SIGNAL_NODES_ADDED,
+    SIGNAL_LIGHTS_ADDED,
+    DATA_SCHEDULER,
+    DOMAIN_MAX_IN_FLIGHT,
+)
+from .api import RainMakerClient
+from .breaker import BridgeCircuitBreaker, STATE_OPEN, STATE_CLOSED
+from .capture import TrafficRecorder
+from .exceptions import BridgeUnavailableError
+from .coordinator import RainMakerNodesCoordinator, RainMakerParamsCoordinator
+from .devices import RainMakerDeviceStore
+from .entities import RainMakerEntityIndex
+from .scheduler import DomainScheduler
+from .stream import RainMakerEventStream
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor", "light"]
 
+# Service fields mapped to the RainMaker Light params they set
+SET_LIGHTS_FIELDS = {
+    "power": "Power",
+    "brightness": "Brightness",
+    "hue": "Hue",
+    "saturation": "Saturation",
+}
+
+SET_LIGHTS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_NODE_IDS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_ENTITY_ID, default=[]): cv.entity_ids,
+    vol.Optional("power"): cv.boolean,
+    vol.Optional("brightness"): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+    vol.Optional("hue"): vol.All(vol.Coerce(int), vol.Range(min=0, max=360)),
+    vol.Optional("saturation"): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+})
+
+START_CAPTURE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ANONYMIZE, default=True): cv.boolean,
+})
+
+def _entries_data(hass: HomeAssistant):
+    """Return {entry_id: entry data} of the loaded entries, without the shared scheduler."""
+    return {key: value for key, value in hass.data[DOMAIN].items() if key != DATA_SCHEDULER}
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
+    # One scheduler for all entries keeps bridges from polling in step
+    domain_scheduler = hass.data[DOMAIN].get(DATA_SCHEDULER)
+    if domain_scheduler is None:
+        domain_scheduler = hass.data[DOMAIN][DATA_SCHEDULER] = DomainScheduler(hass, DOMAIN_MAX_IN_FLIGHT)
+
+    # Options override the settings the config flow picked from its probe
+    config = {**entry.data, **entry.options}
+    max_concurrency = config.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+    store = Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry.entry_id}")
+
+    # Every request to the bridge goes through one circuit breaker
+    bridge_coordinators = []
+
+    @callback
+    def _async_breaker_state_changed(old_state, new_state):
+        if new_state == STATE_OPEN:
+            # Mark all entities unavailable in one go instead of N timeouts per cycle
+            for bridge_coordinator in bridge_coordinators:
+                bridge_coordinator.async_set_update_error(BridgeUnavailableError("Bridge is unreachable"))
+        elif new_state == STATE_CLOSED and old_state != STATE_CLOSED:
+            for bridge_coordinator in bridge_coordinators:
+                hass.async_create_task(bridge_coordinator.async_request_refresh())
+
+    breaker = BridgeCircuitBreaker(
+        BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT, _async_breaker_state_changed
+    )
+    # One client per entry owns the connection pool for every request to the bridge
+    client = RainMakerClient(
+        entry.data["host"],
+        entry.data["port"],
+        breaker,
+        max_concurrency,
+        config.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+    )
+    domain_scheduler.async_add_bridge(entry.entry_id, client.scheduler)
+
+    # One coordinator per entry fetches /rainmakernodes for every entity; both
+    # coordinators keep one shared record per node up to date for the entities
+    coordinator = RainMakerNodesCoordinator(hass, client, store, RainMakerDeviceStore())
+
+    # Build entities straight from the discovery cache when there is one and
+    # refresh it in the background, so startup does not wait on the bridge
+    cached = await coordinator.async_load_cache()
+    if not cached:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except ConfigEntryNotReady:
+            domain_scheduler.async_remove_entry(entry.entry_id)
+            await client.async_close()
+            raise
+
+        # Single discovery pass shared by the light and sensor platforms
+        await coordinator.async_discover()
+
+    # Light params are polled for all lights together, seeded from discovery
+    params_coordinator = RainMakerParamsCoordinator(
+        hass, client, coordinator, config.get(CONF_POLL_INTERVAL, POLL_MIN_INTERVAL)
+    )
+    initial_params = {}
+    for node_id in coordinator.node_details:
+        node_detail = coordinator.get_light_detail(node_id)
+        if node_detail is not None:
+            initial_params[node_id] = node_detail.get("params", {})
+    params_coordinator.set_node_ids(initial_params)
+    params_coordinator.async_set_updated_data(initial_params)
+    bridge_coordinators.extend((coordinator, params_coordinator))
+    # Entities are created for these nodes; later node list refreshes are diffed against them
+    coordinator.set_known_nodes(coordinator.data)
+
     hass.data[DOMAIN][entry.entry_id] = {
         "host": entry.data["host"],
         "port": entry.data["port"],
+        "coordinator": coordinator,
+        "params_coordinator": params_coordinator,
+        "client": client,
+        "stream": None,
+        "entities": RainMakerEntityIndex(hass),
     }
 
+    # Pick up added and removed nodes on every node list refresh without a reload
+    sync_lock = asyncio.Lock()
+
+    @callback
+    def _async_add_lights(node_ids):
+        """Start polling and create lights for nodes whose details just arrived."""
+        lights = {node_id for node_id in node_ids if coordinator.get_light_detail(node_id) is not None}
+        if not lights:
+            return
+        for node_id in lights:
+            params_coordinator.async_update_node(node_id, coordinator.get_light_detail(node_id).get("params", {}))
+        params_coordinator.set_node_ids(params_coordinator.node_ids | lights)
+        _LOGGER.info(f"Adding {len(lights)} RainMaker lights")
+        async_dispatcher_send(hass, SIGNAL_LIGHTS_ADDED.format(entry.entry_id), lights)
+
+    async def _async_sync_nodes():
+        async with sync_lock:
+            added, removed, fetched = await coordinator.async_sync_nodes()
+
+            if added:
+                _LOGGER.info(f"Adding {len(added)} new RainMaker nodes")
+                async_dispatcher_send(hass, SIGNAL_NODES_ADDED.format(entry.entry_id), added)
+            # Only new nodes and nodes that had no details yet were fetched
+            _async_add_lights(fetched)
+
+            if removed:
+                params_coordinator.set_node_ids(params_coordinator.node_ids - removed)
+                # Detaching the device from the entry removes its entities as well
+                _LOGGER.info(f"Retiring {len(removed)} RainMaker nodes no longer reported by the bridge")
+                device_registry = dr.async_get(hass)
+                for node_id in removed:
+                    device = device_registry.async_get_device(identifiers={(DOMAIN, f"rainmaker_{node_id}")})
+                    if device is not None:
+                        device_registry.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+    @callback
+    def _async_nodes_updated():
+        if coordinator.last_update_success and not sync_lock.locked():
+            entry.async_create_background_task(hass, _async_sync_nodes(), f"{DOMAIN} node sync")
+
+    # Optional push updates; polling falls back to slow reconciliation while connected
+    if config.get(CONF_PUSH_UPDATES, False):
+        stream = RainMakerEventStream(hass, client, coordinator, params_coordinator)
+        stream.async_start(entry)
+        hass.data[DOMAIN][entry.entry_id]["stream"] = stream
+
+    # Services act on every loaded entry, so the first entry registers them
+    if not hass.services.has_service(DOMAIN, SERVICE_SET_LIGHTS):
+        _async_register_services(hass)
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Changed options take effect by reloading the entry
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+
+    # Only once the platforms listen for added nodes
+    entry.async_on_unload(coordinator.async_add_listener(_async_nodes_updated))
+
+    # Periodic refreshes start on this entry's slots of the shared poll grid
+    domain_scheduler.async_add_polls(entry.entry_id, (coordinator, params_coordinator))
+
+    if cached:
+        async def _async_refresh_discovery():
+            await coordinator.async_refresh()
+            if not coordinator.last_update_success:
+                return
+            # Refresh the cached details; the refresh has already started a
+            # node sync that fetches details of new nodes
+            async with sync_lock:
+                missing = set(coordinator.missing_details)
+                fetched = await coordinator.async_discover(coordinator.known_node_ids & set(coordinator.data))
+                # Nodes missing from the cache have no light entity yet
+                _async_add_lights(fetched & missing)
+
+        entry.async_create_background_task(
+            hass, _async_refresh_discovery(), f"{DOMAIN} discovery refresh"
+        )
+
+    return True
+
+@callback
+def _async_register_services(hass: HomeAssistant):
+    """Register the domain services; they stay until the last entry unloads."""
     # Register service to force device name refresh
     async def force_device_name_refresh(call: ServiceCall):
-        """Service to force refresh of device names from ESP RainMaker."""
+        """Service to re-read Light.Name of every light and rename what changed."""
         _LOGGER.info("Force device name refresh service called")
 
-        # Get all ESP RainMaker light entities and trigger name refresh
-        from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
-        entity_registry = async_get_entity_registry(hass)
+        async def _async_refresh_entry_names(entry_data):
+            params_coordinator = entry_data["params_coordinator"]
+            entity_index = entry_data["entities"]
+            node_ids = [node_id for node_id in entity_index.node_ids if node_id in params_coordinator.node_ids]
+
+            def _names():
+                data = params_coordinator.data or {}
+                return {node_id: data.get(node_id, {}).get("Light", {}).get("Name") for node_id in node_ids}
+
+            # One batched read for all of this bridge's lights; lights whose
+            # Light.Name changed rename themselves as the read-back is applied
+            previous = _names()
+            await params_coordinator.async_refresh_nodes(node_ids)
 
-        for entity_id, entity_entry in entity_registry.entities.items():
-            if entity_entry.platform == DOMAIN and entity_id.startswith("light."):
-                # Get the entity and trigger a name refresh
-                entity = hass.states.get(entity_id)
-                if entity:
-                    # Trigger an update for this entity
-                    await hass.services.async_call(
-                        "homeassistant",
-                        "update_entity",
-                        {"entity_id": entity_id}
-                    )
+            renamed = 0
+            for node_id, name in _names().items():
+                # Also catches status sensors and devices still named from setup
+                if name and (entity_index.async_apply_name(node_id, name) or name != previous[node_id]):
+                    renamed += 1
+            return renamed
 
-        _LOGGER.info("Device name refresh completed")
+        results = await asyncio.gather(*(
+            _async_refresh_entry_names(entry_data) for entry_data in _entries_data(hass).values()
+        ))
+        _LOGGER.info(f"Device name refresh completed, {sum(results)} devices renamed")
 
     # Register the service
     hass.services.async_register(
@@ -46,14 +275,111 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         schema=None
     )
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    return True
+    # Register service to set many lights at once (scenes, groups)
+    async def set_lights(call: ServiceCall):
+        """Service to send the same Light params to a group of lights."""
+        light_data = {
+            param: call.data[field]
+            for field, param in SET_LIGHTS_FIELDS.items()
+            if field in call.data
+        }
+        if not light_data:
+            _LOGGER.warning("set_lights called without any Light params")
+            return
+
+        node_ids = set(call.data[ATTR_NODE_IDS])
+        if call.data[ATTR_ENTITY_ID]:
+            from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
+            entity_registry = async_get_entity_registry(hass)
+            for entity_id in call.data[ATTR_ENTITY_ID]:
+                entity_entry = entity_registry.async_get(entity_id)
+                if (
+                    entity_entry
+                    and entity_entry.platform == DOMAIN
+                    and entity_entry.unique_id.startswith("esp_rainmaker_light_")
+                ):
+                    node_ids.add(entity_entry.unique_id[len("esp_rainmaker_light_"):])
+                else:
+                    _LOGGER.warning(f"{entity_id} is not an ESP RainMaker light")
+
+        # Each bridge gets one bulk request (or one bounded fan-out) for its own nodes
+        results = await asyncio.gather(*(
+            entry_data["params_coordinator"].async_set_group(node_ids, light_data)
+            for entry_data in _entries_data(hass).values()
+        ))
+        succeeded = sum(len(result) for result in results)
+        _LOGGER.info(f"Set {light_data} on {succeeded} of {len(node_ids)} ESP RainMaker lights")
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_LIGHTS,
+        set_lights,
+        schema=SET_LIGHTS_SCHEMA
+    )
+
+    # Register services to record bridge traffic for offline replay
+    async def start_capture(call: ServiceCall):
+        """Service to start recording every bridge's requests and events."""
+        timestamp = dt_util.now().strftime("%Y%m%d-%H%M%S")
+        for entry_id, entry_data in _entries_data(hass).items():
+            client = entry_data["client"]
+            if client.recorder is not None:
+                continue
+            path = hass.config.path(f"{DOMAIN}-capture-{entry_id}-{timestamp}.jsonl")
+            client.recorder = TrafficRecorder(path, call.data[ATTR_ANONYMIZE])
+            _LOGGER.info(f"Recording traffic of {client.base_url} to {path}")
+
+    async def stop_capture(call: ServiceCall):
+        """Service to stop recording and write out the captures."""
+        await asyncio.gather(*(
+            _async_stop_capture(entry_data["client"]) for entry_data in _entries_data(hass).values()
+        ))
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_CAPTURE,
+        start_capture,
+        schema=START_CAPTURE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_CAPTURE,
+        stop_capture,
+        schema=None
+    )
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def _async_stop_capture(client):
+    """Stop a running capture of one client and flush it to disk."""
+    recorder, client.recorder = client.recorder, None
+    if recorder is not None:
+        await recorder.async_close()
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the discovery cache of a removed entry."""
+    await Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry.entry_id}").async_remove()
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        domain_scheduler = hass.data[DOMAIN][DATA_SCHEDULER]
+        domain_scheduler.async_remove_entry(entry.entry_id)
+        if not domain_scheduler.entry_ids:
+            domain_scheduler.async_shutdown()
+            hass.data[DOMAIN].pop(DATA_SCHEDULER)
+        if entry_data["stream"] is not None:
+            await entry_data["stream"].async_stop()
+        await entry_data["params_coordinator"].async_shutdown()
+        await _async_stop_capture(entry_data["client"])
+        await entry_data["client"].async_close()
 
-        # Remove the service
-        hass.services.async_remove(DOMAIN, "refresh_device_names")
+        # Remove the services with the last entry; the others still use them
+        if not _entries_data(hass):
+            hass.services.async_remove(DOMAIN, "refresh_device_names")
+            hass.services.async_remove(DOMAIN, SERVICE_SET_LIGHTS)
+            hass.services.async_remove(DOMAIN, SERVICE_START_CAPTURE)
+            hass.services.async_remove(DOMAIN, SERVICE_STOP_CAPTURE)
     return unload_ok
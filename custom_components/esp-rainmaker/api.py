@@ -0,0 +1,364 @@
+import asyncio
+import json
+import random
+import time
+import aiohttp
+from .breaker import BridgeCircuitBreaker
+from .metrics import BridgeMetrics
+from .scheduler import (
+    BridgeRequestScheduler,
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    PRIORITY_DISCOVERY,
+)
+from .const import (
+    DEFAULT_MAX_CONCURRENCY,
+    BULK_PARAMS_BATCH_SIZE,
+    CONNECTION_KEEPALIVE,
+    REQUEST_RETRIES,
+    REQUEST_RETRY_BACKOFF,
+    STREAM_PATH,
+    STREAM_IDLE_TIMEOUT,
+)
+from .exceptions import (
+    BridgeUnavailableError,
+    RainMakerCommandError,
+    RainMakerConnectionError,
+    RainMakerError,
+    RainMakerResponseError,
+    RainMakerUnsupportedError,
+    RequestDroppedError,
+)
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Statuses a bridge answers with when it does not provide an optional endpoint
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+# Per-endpoint timeouts; bulk reads and the full node list scale with fleet size
+REQUEST_TIMEOUTS = {
+    "rainmakernodes": aiohttp.ClientTimeout(total=20, connect=5, sock_read=15),
+    "nodedetails": aiohttp.ClientTimeout(total=10, connect=5, sock_read=8),
+    "getparams": aiohttp.ClientTimeout(total=8, connect=5, sock_read=6),
+    "getparams_bulk": aiohttp.ClientTimeout(total=20, connect=5, sock_read=15),
+    "setparams": aiohttp.ClientTimeout(total=8, connect=5, sock_read=6),
+    "setparams_bulk": aiohttp.ClientTimeout(total=20, connect=5, sock_read=15),
+    "events": aiohttp.ClientTimeout(total=None, connect=5, sock_read=STREAM_IDLE_TIMEOUT),
+}
+
+
+# Only these fields of node list records and params are used by the integration
+NODE_FIELDS = ("node_id", "name", "type", "node_type", "connected", "is_matter")
+NODE_DETAIL_FIELDS = ("name", "model", "fw_version")
+PARAM_DEVICES = ("Light",)
+
+
+def json_loads(body):
+    """Decode a JSON body with orjson when it is installed, the stdlib otherwise."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _slim_node(device):
+    """Keep only the node list fields the integration uses."""
+    return {key: device[key] for key in NODE_FIELDS if key in device}
+
+
+def _slim_params(params):
+    """Keep only the params of the devices the integration uses."""
+    return {key: params[key] for key in PARAM_DEVICES if key in params}
+
+
+def _slim_node_detail(node_detail):
+    """Keep only the nodedetails fields the integration uses."""
+    slim = {key: node_detail[key] for key in NODE_DETAIL_FIELDS if key in node_detail}
+    slim["params"] = _slim_params(node_detail.get("params", {}))
+    return slim
+
+
+class RainMakerClient:
+    """HTTP client for one RainMaker bridge.
+
+    Owns a keep-alive connection pool sized for the bridge, applies an explicit
+    timeout per endpoint, retries idempotent reads with jittered backoff, routes
+    every request through the entry's circuit breaker and records its cost in
+    metrics. Short requests wait for a slot from the priority scheduler, so
+    commands overtake polls and the optional rate limit is respected.
+    """
+
+    def __init__(self, host, port, breaker: BridgeCircuitBreaker, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limit=0):
+        self.base_url = f"http://{host}:{port}"
+        self.breaker = breaker
+        self.max_concurrency = max_concurrency
+        self.metrics = BridgeMetrics()
+        self.scheduler = BridgeRequestScheduler(max_concurrency, rate_limit)
+        # TrafficRecorder while a capture is running
+        self.recorder = None
+        # None until the bridge has been asked, then True/False
+        self.bulk_get_supported = None
+        self.bulk_set_supported = None
+        self._session = None
+
+    @property
+    def session(self):
+        """Return the pooled session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            # Polls use up to max_concurrency connections; leave room for the event
+            # stream and interactive commands so they never queue behind polls
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency + 2,
+                limit_per_host=self.max_concurrency + 2,
+                keepalive_timeout=CONNECTION_KEEPALIVE,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def async_close(self):
+        """Close the connection pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _async_request(self, method, endpoint, path, priority, params=None, json=None, retries=0):
+        """Make one request and return the decoded JSON body.
+
+        Connection errors, truncated bodies and timeouts are retried up to
+        `retries` times with jittered exponential backoff, unless the circuit
+        breaker opens meanwhile. Other aiohttp errors (e.g. an invalid URL) are
+        raised as RainMakerConnectionError right away. Raises
+        RequestDroppedError if a poll is shed by the scheduler.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.scheduler.slot(priority):
+                    with self.metrics.track_request(endpoint), self.breaker.guard():
+                        started = time.monotonic()
+                        async with self.session.request(
+                            method,
+                            f"{self.base_url}{path}",
+                            params=params,
+                            json=json,
+                            timeout=REQUEST_TIMEOUTS[endpoint],
+                        ) as resp:
+                            body = await resp.read() if resp.status == 200 else None
+                            if self.recorder is not None:
+                                self.recorder.record(
+                                    method, endpoint, path, params, json,
+                                    resp.status, time.monotonic() - started, body,
+                                )
+                            if resp.status != 200:
+                                raise RainMakerResponseError(resp.status)
+                # Decode outside the breaker guard; a bad body still proves the bridge answered
+                try:
+                    return json_loads(body)
+                except ValueError as e:
+                    raise RainMakerResponseError(resp.status, f"Invalid JSON from {path}: {e}") from e
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                if self.recorder is not None:
+                    self.recorder.record(
+                        method, endpoint, path, params, json,
+                        None, time.monotonic() - started, None, error=type(e).__name__,
+                    )
+                if attempt >= retries:
+                    raise RainMakerConnectionError(
+                        f"{method} {path} failed: {str(e) or type(e).__name__}"
+                    ) from e
+            except aiohttp.ClientError as e:
+                # Retrying cannot fix these
+                raise RainMakerConnectionError(
+                    f"{method} {path} failed: {str(e) or type(e).__name__}"
+                ) from e
+            attempt += 1
+            delay = REQUEST_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            _LOGGER.debug(f"Retrying {method} {path} in {delay:.2f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+    async def async_get_nodes(self, priority=PRIORITY_POLL):
+        """Return the device list from /rainmakernodes, trimmed to the fields in use."""
+        data = await self._async_request(
+            "GET", "rainmakernodes", "/rainmakernodes", priority, retries=REQUEST_RETRIES
+        )
+        return [_slim_node(device) for device in data.get("devices", [])]
+
+    async def async_get_node_details(self, node_id):
+        """Return the node_details list from /nodedetails/{node_id}, trimmed to the fields in use."""
+        data = await self._async_request(
+            "GET", "nodedetails", f"/nodedetails/{node_id}", PRIORITY_DISCOVERY, retries=REQUEST_RETRIES
+        )
+        return [
+            _slim_node_detail(node_detail)
+            for node_detail in data.get("details", {}).get("node_details", [])
+        ]
+
+    async def async_get_params(self, node_id, priority=PRIORITY_POLL):
+        """Return the params of one node from /getparams/{node_id}."""
+        data = await self._async_request(
+            "GET", "getparams", f"/getparams/{node_id}", priority, retries=REQUEST_RETRIES
+        )
+        return _slim_params(data.get("params", {}))
+
+    async def async_get_params_many(self, node_ids, priority=PRIORITY_POLL):
+        """Return {node_id: params} for many nodes in as few requests as possible.
+
+        The bridge is first asked for many nodes at once via
+        GET /getparams?node_ids=a,b,c, which answers with
+        {"nodes": [{"node_id": ..., "params": {...}}, ...]}. Bridges without that
+        endpoint, or whose bulk endpoint has failed before ever answering, fall
+        back to per-node /getparams/{node_id} calls issued concurrently in a
+        single batch. Nodes that fail or are shed by the scheduler are left out.
+        """
+        node_ids = list(node_ids)
+        if not node_ids:
+            return {}
+
+        if self.bulk_get_supported is not False:
+            try:
+                return await self._async_get_params_bulk(node_ids, priority)
+            except RainMakerUnsupportedError:
+                pass
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _fetch(node_id):
+            async with semaphore:
+                try:
+                    return node_id, await self.async_get_params(node_id, priority)
+                except BridgeUnavailableError:
+                    raise
+                except RequestDroppedError:
+                    return node_id, None
+                except RainMakerError as e:
+                    _LOGGER.error(f"Failed to fetch params for {node_id}: {e}")
+                    return node_id, None
+
+        results = await asyncio.gather(*(_fetch(node_id) for node_id in node_ids))
+        return {node_id: params for node_id, params in results if params is not None}
+
+    async def _async_get_params_bulk(self, node_ids, priority):
+        """Fetch params through the bulk endpoint in batches.
+
+        Raises RainMakerUnsupportedError when the nodes should be read one by
+        one instead: always for an unsupported status, and for any error status
+        while the endpoint has never answered successfully.
+        """
+        params = {}
+        for start in range(0, len(node_ids), BULK_PARAMS_BATCH_SIZE):
+            batch = node_ids[start:start + BULK_PARAMS_BATCH_SIZE]
+            try:
+                data = await self._async_request(
+                    "GET",
+                    "getparams_bulk",
+                    "/getparams",
+                    priority,
+                    params={"node_ids": ",".join(batch)},
+                    retries=REQUEST_RETRIES,
+                )
+            except RainMakerResponseError as e:
+                if e.status in UNSUPPORTED_STATUSES:
+                    _LOGGER.info(f"Bridge at {self.base_url} has no bulk getparams endpoint, polling nodes individually")
+                    self.bulk_get_supported = False
+                    raise RainMakerUnsupportedError(e.status) from e
+                if self.bulk_get_supported is None:
+                    # Not known to work on this bridge yet; keep the flag open and read nodes one by one
+                    _LOGGER.debug(f"Bulk getparams failed before ever succeeding ({e}), polling nodes individually")
+                    raise RainMakerUnsupportedError(e.status) from e
+                _LOGGER.error(f"Failed to fetch bulk params: {e}")
+                continue
+
+            self.bulk_get_supported = True
+            for node in data.get("nodes", []):
+                node_id = node.get("node_id")
+                if node_id:
+                    params[node_id] = _slim_params(node.get("params", {}))
+
+        return params
+
+    async def async_set_params(self, node_id, light_data):
+        """Send Light params to one node via POST /setparams/{node_id}."""
+        try:
+            result = await self._async_request(
+                "POST", "setparams", f"/setparams/{node_id}", PRIORITY_COMMAND, json={"Light": light_data}
+            )
+        except RainMakerResponseError as e:
+            raise RainMakerCommandError(str(e)) from e
+        if not result.get("success", False):
+            raise RainMakerCommandError(result.get("error", "Unknown error"))
+
+    async def async_set_params_many(self, node_ids, light_data):
+        """Send the same Light params to many nodes via bulk POST /setparams.
+
+        Returns the nodes that accepted them. Raises RainMakerUnsupportedError if
+        the bridge has no bulk endpoint, or if it fails with an error status
+        before the endpoint has ever succeeded.
+        """
+        if self.bulk_set_supported is False:
+            raise RainMakerUnsupportedError(404)
+
+        node_ids = list(node_ids)
+        succeeded = []
+        for start in range(0, len(node_ids), BULK_PARAMS_BATCH_SIZE):
+            batch = node_ids[start:start + BULK_PARAMS_BATCH_SIZE]
+            try:
+                result = await self._async_request(
+                    "POST",
+                    "setparams_bulk",
+                    "/setparams",
+                    PRIORITY_COMMAND,
+                    json={"node_ids": batch, "params": {"Light": light_data}},
+                )
+            except RainMakerResponseError as e:
+                if e.status in UNSUPPORTED_STATUSES:
+                    _LOGGER.info(f"Bridge at {self.base_url} has no bulk setparams endpoint, fanning out per node")
+                    self.bulk_set_supported = False
+                    raise RainMakerUnsupportedError(e.status) from e
+                if self.bulk_set_supported is None:
+                    # Not known to work on this bridge yet; keep the flag open and fan out this time
+                    _LOGGER.debug(f"Bulk setparams failed before ever succeeding ({e}), fanning out per node")
+                    raise RainMakerUnsupportedError(e.status) from e
+                _LOGGER.error(f"Failed to set bulk params: {e}")
+                continue
+
+            self.bulk_set_supported = True
+            if result.get("success", False):
+                succeeded.extend(batch)
+            else:
+                _LOGGER.error(f"Failed to set bulk params: {result.get('error', 'Unknown error')}")
+
+        return succeeded
+
+    async def async_open_event_stream(self):
+        """Open the Server-Sent Events stream and return the live response.
+
+        The caller reads resp.content and must close the response. The breaker is
+        consulted but not held, so recovery probing is left to short requests.
+        Raises RainMakerUnsupportedError if the bridge has no event stream.
+        """
+        if self.breaker.is_open:
+            raise BridgeUnavailableError("Bridge is unreachable, not subscribing")
+
+        try:
+            with self.metrics.track_request("events"):
+                resp = await self.session.get(
+                    f"{self.base_url}{STREAM_PATH}",
+                    headers={"Accept": "text/event-stream"},
+                    timeout=REQUEST_TIMEOUTS["events"],
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure()
+            raise RainMakerConnectionError(f"GET {STREAM_PATH} failed: {str(e) or type(e).__name__}") from e
+        self.breaker.record_success()
+
+        if resp.status != 200:
+            resp.release()
+            if resp.status in UNSUPPORTED_STATUSES:
+                raise RainMakerUnsupportedError(resp.status)
+            raise RainMakerResponseError(resp.status)
+        return resp
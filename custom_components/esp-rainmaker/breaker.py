@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+import asyncio
+import time
+import aiohttp
+from .exceptions import BridgeUnavailableError
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class BridgeCircuitBreaker:
+    """Shared health state for every HTTP call to one bridge.
+
+    After failure_threshold consecutive connection errors or timeouts the breaker
+    opens and requests fail fast. Once reset_timeout has passed, a single probe
+    request is let through (half-open). Its outcome either closes the breaker
+    or opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, on_state_change=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self._on_state_change = on_state_change
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self):
+        """Return True while requests are being refused."""
+        return self.state != STATE_CLOSED
+
+    def before_request(self):
+        """Raise BridgeUnavailableError unless a request may be made now."""
+        if self.state == STATE_CLOSED:
+            return
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise BridgeUnavailableError("Bridge is unreachable, not sending request")
+            self._set_state(STATE_HALF_OPEN)
+        if self._probe_in_flight:
+            raise BridgeUnavailableError("Bridge recovery probe in progress, not sending request")
+        self._probe_in_flight = True
+
+    def record_success(self):
+        """The bridge answered."""
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != STATE_CLOSED:
+            self._set_state(STATE_CLOSED)
+
+    def record_failure(self):
+        """The bridge could not be reached or timed out."""
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == STATE_HALF_OPEN or (
+            self.state == STATE_CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._set_state(STATE_OPEN)
+
+    @contextmanager
+    def guard(self):
+        """Wrap one request: fail fast while open and record its outcome.
+
+        aiohttp errors (connection errors, truncated bodies, an invalid URL) and
+        timeouts count as failures; any HTTP answer, even an error status,
+        proves the bridge is reachable.
+        """
+        self.before_request()
+        try:
+            yield
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.record_failure()
+            raise
+        except asyncio.CancelledError:
+            self._probe_in_flight = False
+            raise
+        except Exception:
+            self.record_success()
+            raise
+        else:
+            self.record_success()
+
+    def _set_state(self, state):
+        old_state = self.state
+        self.state = state
+        if state == STATE_OPEN:
+            _LOGGER.warning(f"Bridge unreachable after {self._failures} failed requests, pausing requests for {self.reset_timeout}s")
+        elif state == STATE_CLOSED:
+            _LOGGER.info("Bridge reachable again, resuming requests")
+        if self._on_state_change is not None:
+            self._on_state_change(old_state, state)
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Buffered records are written to disk in batches of this size
+CAPTURE_FLUSH_SIZE = 200
+# Keys whose string values are user-chosen names
+NAME_KEYS = ("name", "Name")
+
+
+class _Anonymizer:
+    """Replace node IDs and names with stable placeholders."""
+
+    def __init__(self):
+        self._node_ids = {}
+        self._names = {}
+
+    def node_id(self, node_id):
+        if node_id not in self._node_ids:
+            self._node_ids[node_id] = f"node{len(self._node_ids):06d}"
+        return self._node_ids[node_id]
+
+    def name(self, name):
+        if name not in self._names:
+            self._names[name] = f"Device {len(self._names)}"
+        return self._names[name]
+
+    def path(self, path):
+        # /getparams/{node_id}, /nodedetails/{node_id}, /setparams/{node_id}
+        prefix, _, node_id = path.rpartition("/")
+        if prefix in ("/getparams", "/nodedetails", "/setparams"):
+            return f"{prefix}/{self.node_id(node_id)}"
+        return path
+
+    def value(self, value, key=None):
+        """Return value with every node ID and name replaced, recursively."""
+        if isinstance(value, dict):
+            return {k: self.value(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.value(v, key) for v in value]
+        if isinstance(value, str):
+            if key in ("node_id", "node_ids"):
+                return ",".join(self.node_id(node_id) for node_id in value.split(",")) if value else value
+            if key in NAME_KEYS:
+                return self.name(value)
+            if value in self._node_ids:
+                return self._node_ids[value]
+        return value
+
+
+class TrafficRecorder:
+    """Append every request to one bridge, and every pushed event, to a JSON lines file.
+
+    Each line holds the offset from the start of the capture, the request
+    (method, endpoint, path, query and body), the response status, the round
+    trip time and the decoded response body. Events from the stream are
+    recorded as {"t": ..., "event": {...}}. With anonymize set, node IDs and
+    names are replaced by stable placeholders before anything is written.
+    Records are buffered and written from the executor, never from the loop.
+    """
+
+    def __init__(self, path, anonymize=True):
+        self.path = path
+        self.count = 0
+        self._anonymizer = _Anonymizer() if anonymize else None
+        self._started = time.monotonic()
+        self._buffer = []
+        self._flushing = None
+
+    def record(self, method, endpoint, path, params, request_json, status, duration, body, error=None):
+        """Record one request; body is the raw response body or None."""
+        if body is not None:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                body = body.decode("utf-8", "replace")
+        record = {
+            "t": round(max(0.0, time.monotonic() - self._started - duration), 4),
+            "method": method,
+            "endpoint": endpoint,
+            "path": path,
+            "params": params,
+            "json": request_json,
+            "status": status,
+            "duration": round(duration, 4),
+            "body": body,
+        }
+        if error is not None:
+            record["error"] = error
+        if self._anonymizer is not None:
+            # Names and IDs are registered in the order the bridge reveals them
+            record["body"] = self._anonymizer.value(body)
+            record["path"] = self._anonymizer.path(path)
+            record["params"] = self._anonymizer.value(params)
+            record["json"] = self._anonymizer.value(request_json)
+        self._append(record)
+
+    def record_event(self, payload):
+        """Record one event received from the stream."""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if self._anonymizer is not None:
+            event = self._anonymizer.value(event)
+        self._append({"t": round(time.monotonic() - self._started, 4), "event": event})
+
+    def _append(self, record):
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        self.count += 1
+        if len(self._buffer) >= CAPTURE_FLUSH_SIZE and self._flushing is None:
+            self._flushing = asyncio.get_running_loop().create_task(self.async_flush())
+
+    async def async_flush(self):
+        """Write buffered records to the capture file."""
+        try:
+            while self._buffer:
+                lines, self._buffer = self._buffer, []
+                await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+        finally:
+            self._flushing = None
+
+    def _write(self, lines):
+        with open(self.path, "a", encoding="utf-8") as capture:
+            capture.write("\n".join(lines) + "\n")
+
+    async def async_close(self):
+        """Write what is left once recording stops."""
+        if self._flushing is not None:
+            await self._flushing
+        await self.async_flush()
+        _LOGGER.info(f"Captured {self.count} bridge records to {self.path}")
+
@@ -0,0 +1,163 @@
+import time
+from homeassistant.core import HomeAssistant
+from .exceptions import RainMakerCommandError
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _PendingCommand:
+    """The unconfirmed Light params last written to one node."""
+
+    __slots__ = ("seq", "commands", "issued_at", "in_flight")
+
+    def __init__(self):
+        self.seq = 0
+        # seq -> Light params of each command not known to have failed, oldest first
+        self.commands = {}
+        self.issued_at = 0.0
+        self.in_flight = 0
+
+    @property
+    def params(self):
+        """Params the node should show once its surviving commands are applied."""
+        params = {}
+        for light_data in self.commands.values():
+            params.update(light_data)
+        return params
+
+
+class PendingCommandTracker:
+    """Sequence-numbered commands per node, so reads cannot revert them.
+
+    Every command gets the next sequence number when it is issued. A read that
+    started before the node's latest command, or while one is in flight, is
+    stale. A later poll that disagrees with the commanded params is treated as
+    the device not having applied them yet. Only the confirmation read-back,
+    a matching read or the timeout settles a command.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.seq = 0
+        self._pending = {}
+
+    def issue(self, node_id, light_data):
+        """Record a command about to be sent and return its sequence number."""
+        self.seq += 1
+        pending = self._pending.get(node_id)
+        if pending is None:
+            pending = self._pending[node_id] = _PendingCommand()
+        pending.seq = self.seq
+        pending.commands[self.seq] = dict(light_data)
+        pending.issued_at = time.monotonic()
+        pending.in_flight += 1
+        return self.seq
+
+    def sent(self, node_id):
+        """The bridge accepted a command."""
+        pending = self._pending.get(node_id)
+        if pending is not None:
+            pending.in_flight -= 1
+
+    def failed(self, node_id, seq):
+        """The bridge rejected a command; keep protecting only the node's other commands."""
+        pending = self._pending.get(node_id)
+        if pending is None or seq not in pending.commands:
+            # Already settled, e.g. by the timeout
+            return
+        pending.in_flight -= 1
+        del pending.commands[seq]
+        if not pending.commands:
+            del self._pending[node_id]
+        else:
+            # Reads are only stale against commands that may still apply
+            pending.seq = max(pending.commands)
+
+    def is_stale(self, node_id, read_seq, params, confirming=False):
+        """Return True if params read at sequence read_seq must not be applied."""
+        pending = self._pending.get(node_id)
+        if pending is None:
+            return False
+        if time.monotonic() - pending.issued_at > self.timeout:
+            del self._pending[node_id]
+            return False
+        if pending.seq > read_seq or pending.in_flight:
+            return True
+        if confirming:
+            del self._pending[node_id]
+            return False
+
+        light_params = params.get("Light", {})
+        if all(light_params.get(key) == value for key, value in pending.params.items()):
+            # The device has applied the command
+            del self._pending[node_id]
+            return False
+        return True
+
+    def discard(self, node_id):
+        """Forget a node, e.g. once it is no longer polled."""
+        self._pending.pop(node_id, None)
+
+
+class NodeCommandPipeline:
+    """Coalesce Light param writes for one node.
+
+    At most one POST /setparams is in flight per node. Params submitted while a
+    request is in flight are merged (last write wins per key) and sent together
+    as soon as it completes, so a slider drag costs a handful of requests instead
+    of one per step.
+    """
+
+    def __init__(self, hass: HomeAssistant, client, node_id, pending_commands, on_sent):
+        self._hass = hass
+        self._client = client
+        self._node_id = node_id
+        self._pending_commands = pending_commands
+        self._on_sent = on_sent
+        self._pending = {}
+        self._waiters = []
+        self._worker = None
+
+    async def async_send(self, light_data):
+        """Queue Light params and return the merged params that were sent.
+
+        Raises RainMakerCommandError if the request carrying them failed.
+        """
+        self._pending.update(light_data)
+        waiter = self._hass.loop.create_future()
+        self._waiters.append(waiter)
+
+        if self._worker is None:
+            self._worker = self._hass.async_create_task(self._async_drain())
+
+        return await waiter
+
+    async def _async_drain(self):
+        """Send merged pending params until nothing is left."""
+        try:
+            while self._pending:
+                light_data, waiters = self._pending, self._waiters
+                self._pending, self._waiters = {}, []
+
+                seq = self._pending_commands.issue(self._node_id, light_data)
+                try:
+                    await self._client.async_set_params(self._node_id, light_data)
+                except Exception as e:
+                    self._pending_commands.failed(self._node_id, seq)
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(
+                                e if isinstance(e, RainMakerCommandError) else RainMakerCommandError(str(e))
+                            )
+                    continue
+
+                self._pending_commands.sent(self._node_id)
+                # Optimistic state and the coalesced read-back are handled by the owner
+                self._on_sent(self._node_id, light_data)
+
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(light_data)
+        finally:
+            self._worker = None
@@ -1,16 +1,119 @@
 import voluptuous as vol
 from homeassistant import config_entries
-from .const import DOMAIN
+from homeassistant.core import callback
+from .const import (
+    DOMAIN,
+    CONF_MAX_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    CONF_RATE_LIMIT,
+    DEFAULT_RATE_LIMIT,
+    CONF_PUSH_UPDATES,
+    CONF_HEALTH_SENSORS,
+    CONF_POLL_INTERVAL,
+    CONF_PROBE,
+    POLL_MIN_INTERVAL,
+)
+from .exceptions import RainMakerError
+from .probe import async_probe_bridge, recommend_settings
+import logging
+
+_LOGGER = logging.getLogger(__name__)
 
 DATA_SCHEMA = vol.Schema({
     vol.Required("host"): str,
     vol.Optional("port", default=8100): int,
+    vol.Optional(CONF_PUSH_UPDATES, default=False): bool,
+    vol.Optional(CONF_HEALTH_SENSORS, default=False): bool,
 })
 
+
+def _tuning_schema(defaults):
+    """Polling and request limits, prefilled with the probe's recommendation or current values."""
+    return vol.Schema({
+        vol.Optional(
+            CONF_POLL_INTERVAL, default=defaults.get(CONF_POLL_INTERVAL, POLL_MIN_INTERVAL)
+        ): vol.All(int, vol.Range(min=5, max=600)),
+        vol.Optional(
+            CONF_MAX_CONCURRENCY, default=defaults.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+        ): vol.All(int, vol.Range(min=1, max=64)),
+        vol.Optional(
+            CONF_RATE_LIMIT, default=defaults.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+    })
+
+
+async def _async_probe(host, port):
+    """Probe the bridge; returns (probe, recommended settings).
+
+    Raises RainMakerError if the bridge cannot be reached, or ValueError if
+    host and port do not form a valid URL.
+    """
+    probe = await async_probe_bridge(host, port)
+    recommended = recommend_settings(probe)
+    _LOGGER.info(f"Probed RainMaker bridge at {host}:{port}: {probe}, recommending {recommended}")
+    return probe, recommended
+
+
 class EspRainmakerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    def __init__(self):
+        self._data = {}
+        self._recommended = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return EspRainmakerOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="ESP RainMaker", data=user_input)
-        return self.async_show_form(step_id="user", data_schema=DATA_SCHEMA)
+            try:
+                probe, self._recommended = await _async_probe(user_input["host"], user_input["port"])
+            except (RainMakerError, ValueError) as e:
+                _LOGGER.warning(f"Cannot reach RainMaker bridge at {user_input['host']}:{user_input['port']}: {e}")
+                errors["base"] = "cannot_connect"
+            else:
+                self._data = {**user_input, CONF_PROBE: probe}
+                return await self.async_step_tuning()
+        return self.async_show_form(step_id="user", data_schema=DATA_SCHEMA, errors=errors)
+
+    async def async_step_tuning(self, user_input=None):
+        """Confirm or override the settings picked from the probe."""
+        if user_input is not None:
+            return self.async_create_entry(title="ESP RainMaker", data={**self._data, **user_input})
+        return self.async_show_form(step_id="tuning", data_schema=_tuning_schema(self._recommended))
+
+
+class EspRainmakerOptionsFlow(config_entries.OptionsFlow):
+    """Re-probe the bridge and adjust polling, request limits and optional features."""
+
+    def __init__(self, config_entry):
+        self._entry = config_entry
+        self._probe = None
+
+    async def async_step_init(self, user_input=None):
+        current = {**self._entry.data, **self._entry.options}
+        if user_input is not None:
+            return self.async_create_entry(
+                title="", data={**user_input, CONF_PROBE: self._probe or current.get(CONF_PROBE)}
+            )
+
+        errors = {}
+        defaults = current
+        try:
+            probe, recommended = await _async_probe(current["host"], current["port"])
+        except (RainMakerError, ValueError) as e:
+            _LOGGER.warning(f"Cannot reach RainMaker bridge at {current['host']}:{current['port']}: {e}")
+            errors["base"] = "cannot_connect"
+        else:
+            # Offer the fresh recommendation; submitting keeps whatever the user enters
+            self._probe = probe
+            defaults = {**current, **recommended}
+
+        schema = _tuning_schema(defaults).extend({
+            vol.Optional(CONF_PUSH_UPDATES, default=current.get(CONF_PUSH_UPDATES, False)): bool,
+            vol.Optional(CONF_HEALTH_SENSORS, default=current.get(CONF_HEALTH_SENSORS, False)): bool,
+        })
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
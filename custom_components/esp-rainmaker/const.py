@@ -1 +1,90 @@
 DOMAIN = "esp-rainmaker"
+
+# How often the shared coordinator refreshes the /rainmakernodes list (seconds)
+NODES_SCAN_INTERVAL = 30
+
+# How often the params coordinator checks which lights are due for a poll (seconds)
+PARAMS_SCAN_INTERVAL = 5
+
+# Adaptive per-node params polling (seconds): recently changed or commanded nodes
+# are polled at the minimum interval, stable ones back off up to the maximum
+POLL_MIN_INTERVAL = 10
+POLL_MAX_INTERVAL = 120
+POLL_OFFLINE_INTERVAL = 300
+
+# Minimum per-node poll interval picked by the bridge probe in the config and
+# options flows (default POLL_MIN_INTERVAL); stable nodes still back off
+CONF_POLL_INTERVAL = "poll_interval"
+# Measurements of the last probe, stored in the entry for diagnostics
+CONF_PROBE = "probe"
+# Nodes whose params the probe reads, one after the other and all at once
+PROBE_SAMPLE_SIZE = 8
+# Share of the bridge's time a full poll cycle may take at the tuned interval
+PROBE_TARGET_LOAD = 0.2
+
+# Maximum node IDs per bulk GET /getparams?node_ids=... or POST /setparams request
+BULK_PARAMS_BATCH_SIZE = 50
+
+# Upper bound on concurrent per-node requests during discovery
+CONF_MAX_CONCURRENCY = "max_concurrency"
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Key of the DomainScheduler shared by all entries in hass.data[DOMAIN], and
+# its limit on requests in flight across all bridges
+DATA_SCHEDULER = "scheduler"
+DOMAIN_MAX_IN_FLIGHT = 32
+
+# Optional cap on requests per second to the bridge (0 = unlimited)
+CONF_RATE_LIMIT = "rate_limit"
+DEFAULT_RATE_LIMIT = 0
+
+# Optional push updates over a Server-Sent Events stream from the bridge
+CONF_PUSH_UPDATES = "push_updates"
+STREAM_PATH = "/events"
+# Reconnect if the bridge sends nothing (not even a keepalive) for this long (seconds)
+STREAM_IDLE_TIMEOUT = 120
+STREAM_RECONNECT_MIN = 1
+STREAM_RECONNECT_MAX = 60
+# Slow light params reconciliation poll used while the event stream is healthy (seconds)
+RECONCILE_SCAN_INTERVAL = 300
+
+# Delay before reading back a node's params after a burst of commands (seconds)
+COMMAND_CONFIRM_DELAY = 2.0
+# Polls that disagree with an unconfirmed command are ignored for up to this long (seconds)
+COMMAND_PENDING_TIMEOUT = 10
+
+# Group service that sets the same Light params on many lights at once
+SERVICE_SET_LIGHTS = "set_lights"
+ATTR_NODE_IDS = "node_ids"
+
+# Services recording bridge traffic to a JSON lines file for tools/replay_bridge.py
+SERVICE_START_CAPTURE = "start_capture"
+SERVICE_STOP_CAPTURE = "stop_capture"
+ATTR_ANONYMIZE = "anonymize"
+
+# Node list and nodedetails cached in HA storage for fast, non-blocking startup
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.discovery"
+
+# Circuit breaker shared by every request to one bridge
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 30
+
+# Bridge HTTP client: keep-alive pool and retries of idempotent reads
+CONNECTION_KEEPALIVE = 60
+REQUEST_RETRIES = 2
+REQUEST_RETRY_BACKOFF = 0.5
+
+# Optional diagnostic sensors for bridge request load, latency and errors
+CONF_HEALTH_SENSORS = "health_sensors"
+
+# Dispatcher signals (formatted with the entry ID) carrying node IDs that
+# appeared on the bridge, and light nodes whose details arrived
+SIGNAL_NODES_ADDED = f"{DOMAIN}_nodes_added_{{}}"
+SIGNAL_LIGHTS_ADDED = f"{DOMAIN}_lights_added_{{}}"
+
+# Client-side light transitions: frame length bounds (seconds) and the share of
+# the bridge's request capacity that fades may use
+TRANSITION_FRAME_MIN = 0.1
+TRANSITION_FRAME_MAX = 1.0
+TRANSITION_BRIDGE_SHARE = 0.5
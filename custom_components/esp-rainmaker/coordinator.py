@@ -0,0 +1,491 @@
+import asyncio
+import time
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from .const import (
+    DOMAIN,
+    NODES_SCAN_INTERVAL,
+    PARAMS_SCAN_INTERVAL,
+    POLL_MIN_INTERVAL,
+    POLL_MAX_INTERVAL,
+    POLL_OFFLINE_INTERVAL,
+    COMMAND_CONFIRM_DELAY,
+    COMMAND_PENDING_TIMEOUT,
+)
+from .api import RainMakerClient
+from .commands import NodeCommandPipeline, PendingCommandTracker
+from .devices import RainMakerDeviceStore
+from .exceptions import (
+    BridgeUnavailableError,
+    RainMakerError,
+    RainMakerUnsupportedError,
+    RequestDroppedError,
+)
+from .polling import AdaptivePollScheduler
+from .scheduler import PRIORITY_CONFIRM, PRIORITY_POLL
+from .transitions import TransitionScheduler
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RainMakerCoordinator(DataUpdateCoordinator):
+    """Coordinator whose data is a {node_id: record} dict that can also be patched per node.
+
+    Periodic refreshes notify every entity as usual; pushed updates from the event
+    stream only notify the entities registered for the affected node. The
+    refreshes are timed by the DomainScheduler shared by all entries, which
+    spreads the polls of every bridge over time, rather than by a timer of
+    each coordinator.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str, scan_interval: int, devices: RainMakerDeviceStore):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=name,
+            update_interval=None,
+        )
+        self.scan_interval = scan_interval
+        # Current period between refreshes, slower while the event stream is up
+        self.poll_period = scan_interval
+        self.domain_scheduler = None
+        self.devices = devices
+        self._node_listeners = {}
+        # Nodes whose records the running refresh changed; None applies every record
+        self._changed_node_ids = None
+
+    def _store_record(self, node_id, record):
+        """Apply one node's record to the shared device store; subclasses fill this in."""
+
+    @callback
+    def async_update_listeners(self):
+        """Bring the device store up to date before entities read it.
+
+        After a refresh only the records _async_update_data changed are applied.
+        """
+        data = self.data or {}
+        changed, self._changed_node_ids = self._changed_node_ids, None
+        for node_id in data if changed is None else changed:
+            if node_id in data:
+                self._store_record(node_id, data[node_id])
+        super().async_update_listeners()
+
+    @callback
+    def async_set_updated_data(self, data):
+        """Replace the data wholesale, applying every record."""
+        self._changed_node_ids = None
+        super().async_set_updated_data(data)
+
+    @callback
+    def async_add_node_listener(self, node_id, update_callback) -> CALLBACK_TYPE:
+        """Listen for pushed updates of a single node."""
+        listeners = self._node_listeners.setdefault(node_id, set())
+        listeners.add(update_callback)
+
+        @callback
+        def remove_listener():
+            listeners.discard(update_callback)
+            if not listeners:
+                self._node_listeners.pop(node_id, None)
+
+        return remove_listener
+
+    @callback
+    def async_update_node(self, node_id, record):
+        """Replace one node's record in place and notify only its listeners."""
+        if self.data is None:
+            return
+        self.data[node_id] = record
+        self._store_record(node_id, record)
+        for update_callback in list(self._node_listeners.get(node_id, ())):
+            update_callback()
+
+    @callback
+    def async_set_scan_interval(self, scan_interval):
+        """Change the polling interval, e.g. while the event stream is healthy."""
+        self.poll_period = scan_interval
+        if self.domain_scheduler is not None:
+            self.domain_scheduler.async_reschedule()
+
+
+class RainMakerNodesCoordinator(RainMakerCoordinator):
+    """Fetch the /rainmakernodes list once per interval for a whole config entry.
+
+    The result is indexed by node_id so every light and status entity can look up
+    its own node record in constant time instead of downloading and scanning the list.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: RainMakerClient, store: Store, devices: RainMakerDeviceStore):
+        super().__init__(hass, f"{DOMAIN} nodes", NODES_SCAN_INTERVAL, devices)
+        self.client = client
+        self._store = store
+        # node_id -> list of node_details entries from /nodedetails, filled by async_discover
+        self.node_details = {}
+        # Nodes that have entities; async_sync_nodes diffs the node list against it
+        self.known_node_ids = set()
+        # Known nodes whose /nodedetails never arrived, so whether they are lights is unknown
+        self.missing_details = set()
+
+    async def async_load_cache(self):
+        """Seed nodes and details from the last successful discovery.
+
+        Returns False when nothing has been cached yet.
+        """
+        cached = await self._store.async_load()
+        if not cached or not cached.get("nodes"):
+            return False
+
+        self.node_details = cached.get("node_details", {})
+        self._store_details(self.node_details)
+        self.async_set_updated_data(cached["nodes"])
+        _LOGGER.info(f"Loaded {len(self.data)} cached RainMaker nodes for {self.client.base_url}")
+        return True
+
+    def _store_record(self, node_id, record):
+        self.devices.get(node_id).update_node(record)
+
+    def _store_details(self, node_ids):
+        for node_id in node_ids:
+            node_detail = self.get_light_detail(node_id)
+            if node_detail is not None:
+                self.devices.get(node_id).update_details(node_detail)
+
+    async def async_save_cache(self):
+        """Persist the node list and details for the next startup."""
+        await self._store.async_save({
+            "nodes": self.data,
+            "node_details": self.node_details,
+        })
+
+    async def _async_update_data(self):
+        """Fetch the node list and index it by node_id."""
+        self._changed_node_ids = set()
+        with self.client.metrics.track_poll("nodes"):
+            try:
+                devices = await self.client.async_get_nodes()
+            except RequestDroppedError:
+                # The bridge is busy with commands; keep the node list until the next tick
+                return self.data
+            except RainMakerError as e:
+                raise UpdateFailed(f"Error fetching RainMaker nodes: {e}") from e
+
+            nodes = {}
+            for device in devices:
+                node_id = device.get("node_id")
+                if node_id:
+                    nodes[node_id] = device
+            previous = self.data or {}
+            self._changed_node_ids = {
+                node_id for node_id, device in nodes.items() if previous.get(node_id) != device
+            }
+
+            _LOGGER.debug(f"Fetched {len(nodes)} RainMaker nodes from {self.client.base_url}")
+            return nodes
+
+    async def async_discover(self, node_ids=None):
+        """Fetch /nodedetails for the given nodes (default: all) concurrently.
+
+        The result is shared by the light and sensor platforms, so each node is
+        only fetched a single time. Returns the node IDs whose details were fetched.
+        """
+        if node_ids is None:
+            node_ids = list(self.data)
+        semaphore = asyncio.Semaphore(self.client.max_concurrency)
+
+        async def _fetch_details(node_id):
+            async with semaphore:
+                try:
+                    return node_id, await self.client.async_get_node_details(node_id)
+                except BridgeUnavailableError:
+                    return node_id, None
+                except RainMakerError as e:
+                    _LOGGER.warning(f"Failed to fetch details for {node_id}: {e}")
+                    return node_id, None
+
+        results = await asyncio.gather(*(_fetch_details(node_id) for node_id in node_ids))
+
+        # Nodes whose details could not be fetched keep their cached details
+        node_details = {
+            node_id: details
+            for node_id, details in self.node_details.items()
+            if node_id in self.data
+        }
+        fetched = set()
+        for node_id, details in results:
+            if details is not None:
+                node_details[node_id] = details
+                fetched.add(node_id)
+        self.node_details = node_details
+        self.missing_details -= fetched
+        self._store_details(fetched)
+        _LOGGER.info(f"Discovered details for {len(fetched)} of {len(node_ids)} RainMaker nodes")
+
+        if fetched:
+            await self.async_save_cache()
+        return fetched
+
+    def set_known_nodes(self, node_ids):
+        """Record the nodes that got entities; those without details are retried by async_sync_nodes."""
+        self.known_node_ids = set(node_ids)
+        self.missing_details = {node_id for node_id in self.known_node_ids if node_id not in self.node_details}
+
+    async def async_sync_nodes(self):
+        """Diff the latest node list against the nodes that have entities.
+
+        New nodes and known nodes still missing their details get a
+        /nodedetails fetch. Returns (added, removed, fetched); a node whose
+        details could not be fetched is retried on the next refresh.
+        """
+        current = set(self.data or {})
+        added = current - self.known_node_ids
+        # An empty list is far more likely a bridge hiccup than every node leaving
+        removed = self.known_node_ids - current if current else set()
+
+        fetched = set()
+        missing = added | (self.missing_details & current)
+        if missing:
+            fetched = await self.async_discover(missing)
+            self.missing_details |= missing - fetched
+        if removed:
+            for node_id in removed:
+                self.node_details.pop(node_id, None)
+                self.devices.remove(node_id)
+            self.missing_details -= removed
+            await self.async_save_cache()
+
+        self.known_node_ids = (self.known_node_ids | added) - removed
+        return added, removed, fetched
+
+    def get_light_detail(self, node_id):
+        """Return the node_details entry carrying Light params, or None."""
+        for node_detail in self.node_details.get(node_id, []):
+            if "Light" in node_detail.get("params", {}):
+                return node_detail
+        return None
+
+
+class RainMakerParamsCoordinator(RainMakerCoordinator):
+    """Read params for every light node of a config entry in as few requests as possible.
+
+    Each tick only the nodes the adaptive poll scheduler considers due are read,
+    through the client's bulk getparams path.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: RainMakerClient,
+        nodes_coordinator: RainMakerNodesCoordinator,
+        poll_interval=POLL_MIN_INTERVAL,
+    ):
+        super().__init__(hass, f"{DOMAIN} params", PARAMS_SCAN_INTERVAL, nodes_coordinator.devices)
+        self.client = client
+        self._nodes_coordinator = nodes_coordinator
+        # Node IDs whose params are polled; set once discovery has found the lights
+        self.node_ids = set()
+        self._pipelines = {}
+        # poll_interval is tuned per bridge; stable nodes back off from there
+        self.poll_scheduler = AdaptivePollScheduler(
+            poll_interval, max(POLL_MAX_INTERVAL, poll_interval), POLL_OFFLINE_INTERVAL
+        )
+        self.pending_commands = PendingCommandTracker(COMMAND_PENDING_TIMEOUT)
+        # node_id -> monotonic time its confirmation read-back is due; one timer serves all nodes
+        self._confirm_due = {}
+        self._unsub_confirm = None
+        self.transitions = TransitionScheduler(hass, self)
+
+    def _store_record(self, node_id, record):
+        light_params = record.get("Light")
+        if light_params is not None:
+            self.devices.get(node_id).update_light(light_params)
+
+    def set_node_ids(self, node_ids):
+        """Set the light nodes to poll and register them with the scheduler."""
+        now = time.monotonic()
+        for node_id in self.node_ids - set(node_ids):
+            self.poll_scheduler.remove_node(node_id)
+            self.pending_commands.discard(node_id)
+            self._pipelines.pop(node_id, None)
+            self._confirm_due.pop(node_id, None)
+            self.transitions.async_cancel(node_id)
+            if self.data is not None:
+                self.data.pop(node_id, None)
+        self.node_ids = set(node_ids)
+        for node_id in self.node_ids:
+            self.poll_scheduler.add_node(node_id, now)
+
+    def command_pipeline(self, node_id):
+        """Return the command pipeline that serializes writes to this node."""
+        pipeline = self._pipelines.get(node_id)
+        if pipeline is None:
+            pipeline = NodeCommandPipeline(
+                self.hass, self.client, node_id, self.pending_commands, self._handle_command_sent
+            )
+            self._pipelines[node_id] = pipeline
+        return pipeline
+
+    async def async_shutdown(self):
+        """Cancel fades and pending command read-backs along with the polling."""
+        self.transitions.async_shutdown()
+        if self._unsub_confirm is not None:
+            self._unsub_confirm()
+            self._unsub_confirm = None
+        self._confirm_due.clear()
+        await super().async_shutdown()
+
+    @callback
+    def _handle_command_sent(self, node_id, light_data):
+        """Show accepted params right away and confirm them once the device has settled."""
+        now = time.monotonic()
+        self.poll_scheduler.record_activity(node_id, now)
+        if self.data is not None:
+            params = dict(self.data.get(node_id, {}))
+            params["Light"] = {**params.get("Light", {}), **light_data}
+            self.async_update_node(node_id, params)
+
+        # Further commands push the read-back back, so a burst is confirmed once
+        self._confirm_due[node_id] = now + COMMAND_CONFIRM_DELAY
+        if self._unsub_confirm is None:
+            self._unsub_confirm = async_call_later(self.hass, COMMAND_CONFIRM_DELAY, self._async_confirm_due)
+
+    @callback
+    def _async_confirm_due(self, _now):
+        """Read back every node whose confirmation is due in one batch."""
+        self._unsub_confirm = None
+        now = time.monotonic()
+        due = [node_id for node_id, due_at in self._confirm_due.items() if due_at <= now + 0.1]
+        for node_id in due:
+            del self._confirm_due[node_id]
+        if due:
+            self.hass.async_create_task(self.async_refresh_nodes(due, confirm=True))
+        if self._confirm_due:
+            delay = max(0, min(self._confirm_due.values()) - now)
+            self._unsub_confirm = async_call_later(self.hass, delay, self._async_confirm_due)
+
+    async def async_refresh_nodes(self, node_ids, confirm=False):
+        """Read back params for a few nodes and notify only their entities.
+
+        A confirming read-back settles the nodes' pending commands; other reads
+        leave nodes with unconfirmed commands alone.
+        """
+        read_seq = self.pending_commands.seq
+        try:
+            params = await self.client.async_get_params_many(
+                node_ids, PRIORITY_CONFIRM if confirm else PRIORITY_POLL
+            )
+        except RainMakerError as e:
+            _LOGGER.debug(f"Skipping read-back of {len(node_ids)} nodes: {e}")
+            return
+        now = time.monotonic()
+        for node_id, node_params in params.items():
+            if self.pending_commands.is_stale(node_id, read_seq, node_params, confirming=confirm):
+                continue
+            changed = self.data is not None and self.data.get(node_id) != node_params
+            self.poll_scheduler.record_poll(node_id, changed, now)
+            self.async_update_node(node_id, node_params)
+
+    async def async_set_group(self, node_ids, light_data):
+        """Send the same Light params to many nodes and return the nodes that accepted them.
+
+        Uses the bridge's bulk POST /setparams when available, otherwise a fan-out
+        through the per-node command pipelines bounded by max_concurrency. Accepted
+        params are shown optimistically and confirmed by the shared batched read-back.
+        """
+        node_ids = [node_id for node_id in node_ids if node_id in self.node_ids]
+        if not node_ids:
+            return []
+        for node_id in node_ids:
+            self.transitions.async_cancel(node_id)
+
+        seqs = {node_id: self.pending_commands.issue(node_id, light_data) for node_id in node_ids}
+        try:
+            succeeded = await self.client.async_set_params_many(node_ids, light_data)
+        except RainMakerUnsupportedError:
+            for node_id, seq in seqs.items():
+                self.pending_commands.failed(node_id, seq)
+            return await self._async_set_each(node_ids, light_data)
+        except RainMakerError as e:
+            for node_id, seq in seqs.items():
+                self.pending_commands.failed(node_id, seq)
+            _LOGGER.warning(f"Could not set params on {len(node_ids)} lights: {e}")
+            return []
+
+        accepted = set(succeeded)
+        for node_id, seq in seqs.items():
+            if node_id in accepted:
+                self.pending_commands.sent(node_id)
+                self._handle_command_sent(node_id, light_data)
+            else:
+                self.pending_commands.failed(node_id, seq)
+        return succeeded
+
+    async def _async_set_each(self, node_ids, light_data):
+        """Send params through each node's command pipeline with bounded concurrency."""
+        semaphore = asyncio.Semaphore(self.client.max_concurrency)
+
+        async def _send(node_id):
+            async with semaphore:
+                try:
+                    await self.command_pipeline(node_id).async_send(light_data)
+                except Exception as e:
+                    _LOGGER.error(f"Failed to set params on {node_id}: {e}")
+                    return None
+            return node_id
+
+        results = await asyncio.gather(*(_send(node_id) for node_id in node_ids))
+        return [node_id for node_id in results if node_id is not None]
+
+    async def _async_update_data(self):
+        """Fetch params for the light nodes that are due and merge them into the previous data."""
+        self._changed_node_ids = set()
+        now = time.monotonic()
+        nodes = self._nodes_coordinator.data or {}
+        for node_id in self.node_ids:
+            device = nodes.get(node_id)
+            self.poll_scheduler.set_online(
+                node_id, device is None or device.get("connected", True), now
+            )
+
+        # Round to the nearest tick so a node is never polled a whole tick early or late
+        horizon = self.poll_period / 2
+        due = self.poll_scheduler.due_nodes(now, horizon)
+        if not due:
+            return self.data
+
+        with self.client.metrics.track_poll("params"):
+            read_seq = self.pending_commands.seq
+            dropped = self.client.scheduler.dropped
+            try:
+                params = await self.client.async_get_params_many(due)
+            except RequestDroppedError:
+                # Shed while commands queue up; the nodes stay due for the next tick
+                return self.data
+            except RainMakerError as e:
+                raise UpdateFailed(f"Error fetching RainMaker params: {e}") from e
+            if not params and self.client.scheduler.dropped > dropped:
+                return self.data
+            if not params and self.client.breaker.is_open:
+                # The whole bridge is down, not just the due nodes
+                raise UpdateFailed(f"RainMaker bridge at {self.client.base_url} is unavailable")
+
+            data = dict(self.data or {})
+            now = time.monotonic()
+            for node_id in due:
+                if node_id in params and self.pending_commands.is_stale(node_id, read_seq, params[node_id]):
+                    # Keep the commanded state; the node stays on the minimum interval
+                    self.poll_scheduler.record_poll(node_id, True, now)
+                elif node_id in params:
+                    changed = data.get(node_id) != params[node_id]
+                    self.poll_scheduler.record_poll(node_id, changed, now)
+                    data[node_id] = params[node_id]
+                    if changed:
+                        self._changed_node_ids.add(node_id)
+                else:
+                    # Failed polls back off like unchanged ones
+                    self.poll_scheduler.record_poll(node_id, False, now)
+
+            _LOGGER.debug(f"Polled {len(due)} of {len(self.node_ids)} RainMaker lights")
+            return data
@@ -0,0 +1,92 @@
+class RainMakerDevice:
+    """Everything the light and status entities of one node render.
+
+    Updated in place from node list refreshes, nodedetails and params polls,
+    and shared by reference with the node's entities.
+    """
+
+    __slots__ = (
+        "node_id",
+        "node_name",
+        "detail_name",
+        "light_name",
+        "type",
+        "node_type",
+        "model",
+        "fw_version",
+        "connected",
+        "is_matter",
+        "has_light",
+        "power",
+        "brightness",
+        "hue",
+        "saturation",
+    )
+
+    def __init__(self, node_id):
+        self.node_id = node_id
+        self.node_name = None
+        self.detail_name = None
+        self.light_name = None
+        self.type = "RainMaker Device"
+        self.node_type = "unknown"
+        self.model = "Unknown"
+        self.fw_version = "Unknown"
+        self.connected = False
+        self.is_matter = False
+        self.has_light = False
+        self.power = False
+        self.brightness = 100
+        self.hue = 0
+        self.saturation = 100
+
+    @property
+    def name(self):
+        """Light.Name when the device has one, then the nodedetails and node list names."""
+        return self.light_name or self.detail_name or self.node_name
+
+    def update_node(self, record):
+        """Apply a /rainmakernodes record."""
+        self.node_name = record.get("name", self.node_name)
+        self.type = record.get("type", self.type)
+        self.node_type = record.get("node_type", self.node_type)
+        self.connected = record.get("connected", False)
+        self.is_matter = record.get("is_matter", False)
+
+    def update_details(self, node_detail):
+        """Apply the nodedetails entry that carries the Light params."""
+        self.detail_name = node_detail.get("name", self.detail_name)
+        self.model = node_detail.get("model", self.model)
+        self.fw_version = node_detail.get("fw_version", self.fw_version)
+        light_params = node_detail.get("params", {}).get("Light")
+        if light_params is not None:
+            self.has_light = True
+            self.update_light(light_params)
+
+    def update_light(self, light_params):
+        """Apply Light params; keys missing from a partial update keep their value."""
+        self.power = light_params.get("Power", self.power)
+        self.brightness = light_params.get("Brightness", self.brightness)
+        self.hue = light_params.get("Hue", self.hue)
+        self.saturation = light_params.get("Saturation", self.saturation)
+        self.light_name = light_params.get("Name") or self.light_name
+
+
+class RainMakerDeviceStore:
+    """The RainMakerDevice records of one config entry, keyed by node_id."""
+
+    def __init__(self):
+        self._devices = {}
+
+    def __len__(self):
+        return len(self._devices)
+
+    def get(self, node_id):
+        """Return the node's record, creating an empty one on first use."""
+        device = self._devices.get(node_id)
+        if device is None:
+            device = self._devices[node_id] = RainMakerDevice(node_id)
+        return device
+
+    def remove(self, node_id):
+        self._devices.pop(node_id, None)
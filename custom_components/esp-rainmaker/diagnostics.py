@@ -0,0 +1,41 @@
+import time
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN, DATA_SCHEDULER
+
+TO_REDACT = {"host"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return request metrics, poll timings and bridge state for one entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    client = entry_data["client"]
+    coordinator = entry_data["coordinator"]
+    params_coordinator = entry_data["params_coordinator"]
+    stream = entry_data["stream"]
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": dict(entry.options),
+        "bridge": {
+            "breaker_state": client.breaker.state,
+            "bulk_get_supported": client.bulk_get_supported,
+            "bulk_set_supported": client.bulk_set_supported,
+            "max_concurrency": client.max_concurrency,
+            "poll_interval": params_coordinator.poll_scheduler.min_interval,
+            "stream_connected": stream.connected if stream is not None else None,
+        },
+        "nodes": {
+            "count": len(coordinator.data or {}),
+            "with_details": len(coordinator.node_details),
+            "device_records": len(coordinator.devices),
+            "lights": len(params_coordinator.node_ids),
+            "nodes_update_interval": coordinator.poll_period,
+            "params_update_interval": params_coordinator.poll_period,
+        },
+        "polling": params_coordinator.poll_scheduler.as_dict(time.monotonic()),
+        "scheduler": client.scheduler.as_dict(),
+        "domain_scheduler": hass.data[DOMAIN][DATA_SCHEDULER].as_dict(),
+        "metrics": client.metrics.as_dict(),
+    }
@@ -0,0 +1,51 @@
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE, callback
+from homeassistant.helpers import device_registry as dr
+from .const import DOMAIN
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RainMakerEntityIndex:
+    """The light and status entities of one config entry, indexed by node_id.
+
+    Lets a name change reach every entity of a node and its device registry
+    entry without scanning the entity registry.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._entities = {}
+
+    @property
+    def node_ids(self):
+        return list(self._entities)
+
+    @callback
+    def async_add(self, node_id, entity) -> CALLBACK_TYPE:
+        """Index an entity; returns a callback that removes it again."""
+        entities = self._entities.setdefault(node_id, set())
+        entities.add(entity)
+
+        @callback
+        def remove_entity():
+            entities.discard(entity)
+            if not entities:
+                self._entities.pop(node_id, None)
+
+        return remove_entity
+
+    @callback
+    def async_apply_name(self, node_id, name):
+        """Rename a node's entities and device; returns True if anything changed."""
+        changed = False
+        for entity in list(self._entities.get(node_id, ())):
+            changed = entity.async_set_device_name(name) or changed
+
+        device_registry = dr.async_get(self._hass)
+        device = device_registry.async_get_device(identifiers={(DOMAIN, f"rainmaker_{node_id}")})
+        if device is not None and device.name != name:
+            device_registry.async_update_device(device.id, name=name)
+            _LOGGER.info(f"Updated device registry name to '{name}' for device {device.id}")
+            changed = True
+        return changed
@@ -0,0 +1,30 @@
+class RainMakerError(Exception):
+    """Base class for errors talking to a RainMaker bridge."""
+
+
+class RainMakerConnectionError(RainMakerError):
+    """The bridge could not be reached or did not answer in time."""
+
+
+class BridgeUnavailableError(RainMakerConnectionError):
+    """Raised instead of making a request while the circuit breaker is open."""
+
+
+class RainMakerResponseError(RainMakerError):
+    """The bridge answered with an unexpected HTTP status."""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+
+
+class RainMakerUnsupportedError(RainMakerResponseError):
+    """The bridge does not provide an optional endpoint."""
+
+
+class RainMakerCommandError(RainMakerError):
+    """Raised when the bridge rejects or fails a setparams request."""
+
+
+class RequestDroppedError(RainMakerError):
+    """A low-priority request was shed because the bridge request queue is full."""
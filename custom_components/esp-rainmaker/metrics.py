@@ -0,0 +1,167 @@
+from contextlib import contextmanager
+import asyncio
+import time
+from .exceptions import BridgeUnavailableError
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# Weight of the newest sample in the smoothed latency
+LATENCY_SMOOTHING = 0.2
+
+
+class _EndpointStats:
+    """Counters for one bridge endpoint."""
+
+    __slots__ = ("requests", "errors", "timeouts", "rejected", "latency_total", "latency_max", "buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def record_latency(self, elapsed):
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                self.buckets[index] += 1
+                break
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "latency_avg": round(self.latency_total / self.requests, 4) if self.requests else None,
+            "latency_max": round(self.latency_max, 4),
+            "latency_histogram": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+            },
+        }
+
+
+class _PollStats:
+    """Durations of one coordinator's update cycles."""
+
+    __slots__ = ("count", "failures", "last", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.last = None
+        self.total = 0.0
+        self.max = 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "last": round(self.last, 4) if self.last is not None else None,
+            "avg": round(self.total / self.count, 4) if self.count else None,
+            "max": round(self.max, 4),
+        }
+
+
+class BridgeMetrics:
+    """Runtime cost of talking to one bridge.
+
+    Collected by the client for every request, by the coordinators for every
+    update cycle, and exposed through diagnostics and the bridge health sensors.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.in_flight = 0
+        self.in_flight_max = 0
+        self.latency_smoothed = None
+        self._endpoints = {}
+        self._polls = {}
+
+    @property
+    def total_requests(self):
+        return sum(stats.requests for stats in self._endpoints.values())
+
+    @property
+    def total_errors(self):
+        return sum(stats.errors + stats.timeouts for stats in self._endpoints.values())
+
+    def last_poll_duration(self, kind):
+        stats = self._polls.get(kind)
+        return stats.last if stats is not None else None
+
+    @contextmanager
+    def track_request(self, endpoint):
+        """Count one request and time it; requests refused by the breaker are counted apart."""
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = _EndpointStats()
+
+        self.in_flight += 1
+        self.in_flight_max = max(self.in_flight_max, self.in_flight)
+        started = time.monotonic()
+        try:
+            yield
+        except BridgeUnavailableError:
+            stats.rejected += 1
+            raise
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            self._record(stats, time.monotonic() - started)
+            raise
+        except Exception:
+            stats.errors += 1
+            self._record(stats, time.monotonic() - started)
+            raise
+        else:
+            self._record(stats, time.monotonic() - started)
+        finally:
+            self.in_flight -= 1
+
+    @contextmanager
+    def track_poll(self, kind):
+        """Time one coordinator update cycle."""
+        stats = self._polls.get(kind)
+        if stats is None:
+            stats = self._polls[kind] = _PollStats()
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            stats.count += 1
+            stats.last = elapsed
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+
+    def _record(self, stats, elapsed):
+        stats.requests += 1
+        stats.record_latency(elapsed)
+        if self.latency_smoothed is None:
+            self.latency_smoothed = elapsed
+        else:
+            self.latency_smoothed += LATENCY_SMOOTHING * (elapsed - self.latency_smoothed)
+
+    def as_dict(self):
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime": round(uptime, 1),
+            "requests": self.total_requests,
+            "requests_per_minute": round(self.total_requests / uptime * 60, 1) if uptime else None,
+            "errors": self.total_errors,
+            "in_flight": self.in_flight,
+            "in_flight_max": self.in_flight_max,
+            "latency_smoothed": round(self.latency_smoothed, 4) if self.latency_smoothed is not None else None,
+            "endpoints": {endpoint: stats.as_dict() for endpoint, stats in self._endpoints.items()},
+            "polls": {kind: stats.as_dict() for kind, stats in self._polls.items()},
+        }
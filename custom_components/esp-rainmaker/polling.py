@@ -0,0 +1,99 @@
+import random
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _NodePollState:
+    """Poll bookkeeping for a single node."""
+
+    __slots__ = ("interval", "next_due", "online")
+
+    def __init__(self, interval, next_due):
+        self.interval = interval
+        self.next_due = next_due
+        self.online = True
+
+
+class AdaptivePollScheduler:
+    """Decide which nodes are due for a params poll on each coordinator tick.
+
+    Nodes that changed or were commanded recently are polled at the minimum
+    interval. Each poll that finds nothing new doubles the node's interval up to
+    the maximum. Offline nodes are polled at the offline interval. Due times are
+    jittered so nodes drift apart instead of firing in the same tick.
+    """
+
+    def __init__(self, min_interval, max_interval, offline_interval, backoff=2.0, jitter=0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.offline_interval = offline_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self._nodes = {}
+
+    def add_node(self, node_id, now):
+        """Start scheduling a node, spreading first polls over one minimum interval."""
+        if node_id not in self._nodes:
+            self._nodes[node_id] = _NodePollState(
+                self.min_interval, now + random.uniform(0, self.min_interval)
+            )
+
+    def remove_node(self, node_id):
+        """Stop scheduling a node."""
+        self._nodes.pop(node_id, None)
+
+    def due_nodes(self, now, horizon=0):
+        """Return the nodes due by now + horizon."""
+        deadline = now + horizon
+        return [node_id for node_id, state in self._nodes.items() if state.next_due <= deadline]
+
+    def set_online(self, node_id, online, now):
+        """Track connectivity; a node coming back online is polled right away."""
+        state = self._nodes.get(node_id)
+        if state is None or state.online == online:
+            return
+        state.online = online
+        if online:
+            state.interval = self.min_interval
+            state.next_due = now
+        else:
+            state.interval = self.offline_interval
+            self._schedule(state, now)
+
+    def record_poll(self, node_id, changed, now):
+        """Reset to the minimum interval on change, otherwise back off."""
+        state = self._nodes.get(node_id)
+        if state is None:
+            return
+        if not state.online:
+            state.interval = self.offline_interval
+        elif changed:
+            state.interval = self.min_interval
+        else:
+            state.interval = min(state.interval * self.backoff, self.max_interval)
+        self._schedule(state, now)
+
+    def record_activity(self, node_id, now):
+        """A command was sent to the node, so poll it quickly again."""
+        state = self._nodes.get(node_id)
+        if state is None:
+            return
+        state.interval = self.min_interval
+        self._schedule(state, now)
+
+    def _schedule(self, state, now):
+        spread = state.interval * self.jitter
+        state.next_due = now + state.interval + random.uniform(-spread, spread)
+
+    def as_dict(self, now):
+        """Summarize the schedule for diagnostics."""
+        intervals = [state.interval for state in self._nodes.values() if state.online]
+        return {
+            "nodes": len(self._nodes),
+            "offline": len(self._nodes) - len(intervals),
+            "at_min_interval": sum(1 for interval in intervals if interval <= self.min_interval),
+            "at_max_interval": sum(1 for interval in intervals if interval >= self.max_interval),
+            "due": len(self.due_nodes(now)),
+            "polls_per_minute": round(sum(60 / interval for interval in intervals), 1),
+        }
@@ -0,0 +1,97 @@
+import asyncio
+import math
+import statistics
+import time
+from .api import RainMakerClient
+from .breaker import BridgeCircuitBreaker
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    BULK_PARAMS_BATCH_SIZE,
+    CONF_MAX_CONCURRENCY,
+    CONF_POLL_INTERVAL,
+    DEFAULT_MAX_CONCURRENCY,
+    POLL_MIN_INTERVAL,
+    POLL_MAX_INTERVAL,
+    PROBE_SAMPLE_SIZE,
+    PROBE_TARGET_LOAD,
+)
+from .exceptions import RainMakerError
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_probe_bridge(host, port):
+    """Measure a bridge's round trip times, fleet size and parallelism.
+
+    Fetches /rainmakernodes once, reads params of a few nodes one after the
+    other and then all at once, and tries the bulk getparams endpoint. Raises
+    RainMakerError if the node list cannot be fetched.
+    """
+    breaker = BridgeCircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+    # One slot more than the sample, as the scheduler keeps one free for commands
+    client = RainMakerClient(host, port, breaker, PROBE_SAMPLE_SIZE + 1)
+    try:
+        started = time.monotonic()
+        nodes = await client.async_get_nodes()
+        probe = {
+            "nodes": len(nodes),
+            "nodes_rtt": round(time.monotonic() - started, 3),
+            "params_rtt": None,
+            "bulk_rtt": None,
+            "parallelism": 1.0,
+        }
+        sample = [node["node_id"] for node in nodes if node.get("node_id")][:PROBE_SAMPLE_SIZE]
+        if not sample:
+            return probe
+
+        async def _timed_get_params(node_id):
+            started = time.monotonic()
+            try:
+                await client.async_get_params(node_id)
+            except RainMakerError as e:
+                _LOGGER.debug(f"Probe read of {node_id} failed: {e}")
+                return None
+            return time.monotonic() - started
+
+        # Sequential round trips first, so they are not inflated by queueing
+        rtts = [rtt for rtt in [await _timed_get_params(node_id) for node_id in sample[:3]] if rtt is not None]
+        if not rtts:
+            return probe
+        probe["params_rtt"] = round(statistics.median(rtts), 3)
+
+        if len(sample) > 1:
+            started = time.monotonic()
+            results = await asyncio.gather(*(_timed_get_params(node_id) for node_id in sample))
+            elapsed = max(time.monotonic() - started, 0.001)
+            succeeded = len([rtt for rtt in results if rtt is not None])
+            # How many reads the bridge serves in the time of one
+            probe["parallelism"] = round(max(1.0, succeeded * probe["params_rtt"] / elapsed), 2)
+
+        started = time.monotonic()
+        await client.async_get_params_many(sample)
+        if client.bulk_get_supported:
+            probe["bulk_rtt"] = round(time.monotonic() - started, 3)
+        return probe
+    finally:
+        await client.async_close()
+
+
+def recommend_settings(probe):
+    """Pick the poll interval and concurrency limit that fit the measured bridge.
+
+    Concurrency follows the parallelism the bridge showed. The poll interval
+    is the shortest one at which a full poll of every light keeps the bridge
+    busy for at most PROBE_TARGET_LOAD of the time, leaving the rest for
+    commands and the node list.
+    """
+    max_concurrency = max(1, min(DEFAULT_MAX_CONCURRENCY, round(probe["parallelism"])))
+    if probe["bulk_rtt"] is not None:
+        cycle = math.ceil(probe["nodes"] / BULK_PARAMS_BATCH_SIZE) * probe["bulk_rtt"]
+    elif probe["params_rtt"] is not None:
+        cycle = probe["nodes"] * probe["params_rtt"] / max_concurrency
+    else:
+        cycle = 0
+    poll_interval = min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, math.ceil(cycle / PROBE_TARGET_LOAD)))
+    return {CONF_POLL_INTERVAL: poll_interval, CONF_MAX_CONCURRENCY: max_concurrency}
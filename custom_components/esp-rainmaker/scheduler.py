@@ -0,0 +1,322 @@
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from homeassistant.core import HomeAssistant, callback
+from .exceptions import RequestDroppedError
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_COMMAND = 0
+PRIORITY_CONFIRM = 1
+PRIORITY_POLL = 2
+PRIORITY_DISCOVERY = 3
+
+
+class BridgeRequestScheduler:
+    """Order and throttle every short request to one bridge.
+
+    Requests wait in a priority queue (command, confirmation read, poll,
+    discovery) for one of max_in_flight slots and, when a rate limit is set, a
+    token from a token bucket. One slot is kept free for commands so a tap on
+    a light never waits behind a full set of polls. Once max_queue requests
+    are waiting, new polls are dropped instead of queued; they are retried on
+    the next tick anyway. Discovery is already bounded by its own semaphore.
+    """
+
+    def __init__(self, max_in_flight, rate_limit=0, max_queue=None):
+        self.max_in_flight = max_in_flight
+        self.rate_limit = rate_limit
+        self.max_queue = max_queue if max_queue is not None else 2 * max_in_flight
+        self.in_flight = 0
+        self.dropped = 0
+        self.started = 0
+        # DomainScheduler enforcing the limit across bridges, once registered
+        self.parent = None
+        # Allow a burst of one second's worth of requests
+        self._burst = max(1.0, float(rate_limit))
+        self._tokens = self._burst
+        self._refilled_at = time.monotonic()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._wakeup = None
+
+    @property
+    def queued(self):
+        """Number of requests waiting for a slot."""
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    @property
+    def head_priority(self):
+        """Priority of the most urgent waiting request, or None."""
+        return min((priority for priority, _, waiter in self._waiters if not waiter.done()), default=None)
+
+    @asynccontextmanager
+    async def slot(self, priority):
+        """Hold a request slot for the duration of the block."""
+        await self._async_acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _async_acquire(self, priority):
+        """Wait for a slot; raises RequestDroppedError if a poll finds the queue full."""
+        if not self.queued and self._try_start(priority):
+            return
+
+        if priority == PRIORITY_POLL and self.queued >= self.max_queue:
+            self.dropped += 1
+            raise RequestDroppedError("Bridge request queue is full, skipping poll")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), waiter)
+        heapq.heappush(self._waiters, entry)
+        # Nothing may be in flight to wake us later, e.g. when the bucket is
+        # empty; this starts the request or arms the refill timer
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we were cancelled
+                self._release()
+            elif entry in self._waiters:
+                # Drop it now; under a DomainScheduler this bridge is only
+                # woken while it has live waiters, so nothing else would
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _try_start(self, priority):
+        reserved = 0 if priority == PRIORITY_COMMAND else 1
+        if self.in_flight >= max(1, self.max_in_flight - reserved):
+            return False
+        if self.rate_limit:
+            self._refill()
+            if self._tokens < 1:
+                return False
+        if self.parent is not None and not self.parent.try_acquire(priority):
+            return False
+        if self.rate_limit:
+            self._tokens -= 1
+        self.in_flight += 1
+        self.started += 1
+        return True
+
+    def _release(self):
+        self.in_flight -= 1
+        if self.parent is not None:
+            # Wakes this bridge too, in turn with the others
+            self.parent.release()
+        else:
+            self._wake()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+        self._refilled_at = now
+
+    def _wake(self):
+        """Start queued requests in priority order while slots and tokens allow."""
+        while self._waiters:
+            priority, _, waiter = self._waiters[0]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_start(priority):
+                break
+            heapq.heappop(self._waiters)
+            waiter.set_result(None)
+
+        if self._waiters and self.rate_limit and self._tokens < 1 and self._wakeup is None:
+            # Out of tokens: come back when the next one is due
+            delay = (1 - self._tokens) / self.rate_limit
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._wake_from_timer)
+
+    def _wake_from_timer(self):
+        self._wakeup = None
+        self._wake()
+
+    def as_dict(self):
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rate_limit": self.rate_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "started": self.started,
+        }
+
+
+class _PollJob:
+    """One coordinator's periodic refresh, timed by the domain scheduler."""
+
+    __slots__ = ("entry_id", "coordinator", "due", "timer", "task")
+
+    def __init__(self, entry_id, coordinator):
+        self.entry_id = entry_id
+        self.coordinator = coordinator
+        self.due = None
+        self.timer = None
+        self.task = None
+
+
+class DomainScheduler:
+    """Shared by every config entry: spreads polls over time and caps requests across bridges.
+
+    Each bridge's request scheduler asks for a global slot before starting a
+    request, so max_in_flight holds across all bridges (one slot is kept for
+    commands). Freed slots go to the bridge with the most urgent waiting
+    request, round robin between equals.
+
+    Coordinators do not run their own timers. Their refreshes are placed on a
+    shared grid instead: jobs with the same period get evenly spaced phases,
+    so N bridges polling every 5 s each poll once per 5/N s instead of all in
+    the same second.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_in_flight):
+        self._hass = hass
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._bridges = {}
+        self._jobs = []
+        self._epoch = hass.loop.time()
+        self._rotation = 0
+
+    @property
+    def entry_ids(self):
+        """Entries whose bridges are registered."""
+        return set(self._bridges)
+
+    @callback
+    def async_add_bridge(self, entry_id, bridge):
+        """Put a bridge's request scheduler under the global limit; call before its first request."""
+        bridge.parent = self
+        self._bridges[entry_id] = bridge
+
+    @callback
+    def async_add_polls(self, entry_id, coordinators):
+        """Take over the periodic refreshes of an entry's coordinators."""
+        for coordinator in coordinators:
+            coordinator.domain_scheduler = self
+            self._jobs.append(_PollJob(entry_id, coordinator))
+        self.async_reschedule()
+
+    @callback
+    def async_remove_entry(self, entry_id):
+        """Forget an unloaded entry and hand its share to the others."""
+        bridge = self._bridges.pop(entry_id, None)
+        if bridge is not None:
+            # Requests still in flight give their global slots back now
+            self.in_flight -= bridge.in_flight
+            bridge.parent = None
+        for job in self._jobs:
+            if job.entry_id == entry_id:
+                self._cancel(job)
+                if job.task is not None:
+                    job.task.cancel()
+                job.coordinator.domain_scheduler = None
+        self._jobs = [job for job in self._jobs if job.entry_id != entry_id]
+        self.async_reschedule()
+        self._wake_bridges()
+
+    @callback
+    def async_shutdown(self):
+        for job in self._jobs:
+            self._cancel(job)
+
+    def try_acquire(self, priority):
+        """Take a global slot for a request of the given priority, if one is free."""
+        reserved = 0 if priority == PRIORITY_COMMAND else 1
+        if self.in_flight >= max(1, self.max_in_flight - reserved):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake_bridges()
+
+    def _wake_bridges(self):
+        """Let bridges start queued requests, most urgent first and round robin between equals."""
+        bridges = list(self._bridges.values())
+        if not bridges:
+            return
+        self._rotation = (self._rotation + 1) % len(bridges)
+        bridges = bridges[self._rotation:] + bridges[:self._rotation]
+        waiting = [(bridge.head_priority, index, bridge) for index, bridge in enumerate(bridges)]
+        for _, _, bridge in sorted(item for item in waiting if item[0] is not None):
+            if self.in_flight >= self.max_in_flight:
+                break
+            bridge._wake()
+
+    @callback
+    def async_reschedule(self):
+        """Spread the jobs of each period evenly over it, e.g. after a bridge joined or left."""
+        groups = defaultdict(list)
+        for job in self._jobs:
+            groups[job.coordinator.poll_period].append(job)
+
+        now = self._hass.loop.time()
+        for period, jobs in groups.items():
+            for index, job in enumerate(jobs):
+                phase = index * period / len(jobs)
+                # Next point of this job's grid after now
+                due = now - (now - self._epoch - phase) % period + period
+                if job.due is not None and job.timer is not None and abs(job.due - due) < 0.001:
+                    continue
+                self._cancel(job)
+                job.due = due
+                job.timer = self._hass.loop.call_at(due, self._run_job, job)
+
+    def _run_job(self, job):
+        job.timer = None
+        if job.task is None or job.task.done():
+            # Skip a slot while the previous refresh is still running
+            job.task = self._hass.async_create_background_task(
+                job.coordinator.async_refresh(), f"{job.coordinator.name} poll"
+            )
+        period = job.coordinator.poll_period
+        now = self._hass.loop.time()
+        job.due += period
+        if job.due <= now:
+            # Fell behind (e.g. a blocked loop); rejoin the grid instead of catching up
+            job.due += (now - job.due) // period * period + period
+        job.timer = self._hass.loop.call_at(job.due, self._run_job, job)
+
+    def _cancel(self, job):
+        if job.timer is not None:
+            job.timer.cancel()
+            job.timer = None
+
+    def as_dict(self):
+        now = self._hass.loop.time()
+        total = sum(bridge.started for bridge in self._bridges.values())
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "bridges": {
+                entry_id: {
+                    "requests": bridge.started,
+                    "share": round(bridge.started / total, 3) if total else None,
+                    "in_flight": bridge.in_flight,
+                    "queued": bridge.queued,
+                }
+                for entry_id, bridge in self._bridges.items()
+            },
+            "polls": [
+                {
+                    "entry_id": job.entry_id,
+                    "name": job.coordinator.name,
+                    "period": job.coordinator.poll_period,
+                    "next_in": round(job.due - now, 2) if job.due is not None else None,
+                }
+                for job in self._jobs
+            ],
+        }
@@ -1,83 +1,93 @@
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
-from .const import DOMAIN
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import DOMAIN, CONF_HEALTH_SENSORS, SIGNAL_NODES_ADDED
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    host = entry.data["host"]
-    port = entry.data["port"]
-    url = f"http://{host}:{port}/rainmakernodes"
-
-    # Create status sensors for RainMaker devices
-    sensors = []
-
-    # Try to get RainMaker nodes and create status sensors
-    try:
-        session = async_get_clientsession(hass)
-        async with session.get(url) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                devices = data.get("devices", [])
-
-                for device in devices:
-                    # Get the actual device name from Light.Name parameter
-                    node_id = device.get("node_id")
-                    device_name = device.get("name", f"RainMaker Device {node_id[:8]}")
-
-                    if node_id:
-                        # Try to get the actual device name from Light parameters
-                        try:
-                            detail_url = f"http://{host}:{port}/getparams/{node_id}"
-                            async with session.get(detail_url) as detail_resp:
-                                if detail_resp.status == 200:
-                                    detail_data = await detail_resp.json()
-                                    params = detail_data.get("params", {})
-                                    light_params = params.get("Light", {})
-                                    light_device_name = light_params.get("Name", "")
-
-                                    if light_device_name:
-                                        device_name = light_device_name
-                                        _LOGGER.debug(f"Using Light.Name '{device_name}' for sensor {node_id}")
-                        except Exception as e:
-                            _LOGGER.debug(f"Could not fetch Light.Name for {node_id}: {e}")
-
-                    # Update device data with the correct name
-                    device_with_name = device.copy()
-                    device_with_name["name"] = device_name
-
-                    # Create a status entity for each device
-                    sensors.append(RainMakerStatusEntity(hass, f"http://{host}:{port}", device_with_name))
-
-                _LOGGER.info(f"Found {len(devices)} ESP RainMaker devices for status entities")
-            else:
-                _LOGGER.error(f"Failed to fetch RainMaker nodes: HTTP {resp.status}")
-    except Exception as e:
-        _LOGGER.warning(f"Could not fetch RainMaker nodes during setup: {e}")
-
-    async_add_entities(sensors, True)
-
-class RainMakerStatusEntity(SensorEntity):
-    def __init__(self, hass, base_url, device_data):
-        self._hass = hass
-        self._base_url = base_url
-        self._device_data = device_data
-        self._node_id = device_data["node_id"]
-
-        self._device_name = device_data.get("name", f"RainMaker Device {self._node_id[:8]}")
-        self._device_type = device_data.get("type", "RainMaker Device")
-        self._node_type = device_data.get("node_type", "unknown")
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    def _build_status_sensors(node_ids):
+        sensors = []
+        for node_id in node_ids:
+            if node_id not in coordinator.data:
+                continue
+            # Light.Name from the shared discovery pass wins over the node list name
+            device = coordinator.devices.get(node_id)
+            device_name = device.name or f"RainMaker Device {node_id[:8]}"
+
+            # Create a status entity for each device
+            sensors.append(RainMakerStatusEntity(coordinator, device, device_name))
+        return sensors
+
+    @callback
+    def _async_add_status_sensors(node_ids):
+        """Add status sensors for nodes discovered after setup."""
+        async_add_entities(_build_status_sensors(node_ids))
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_NODES_ADDED.format(entry.entry_id), _async_add_status_sensors)
+    )
+
+    sensors = _build_status_sensors(coordinator.data)
+    _LOGGER.info(f"Found {len(sensors)} ESP RainMaker devices for status entities")
+
+    if {**entry.data, **entry.options}.get(CONF_HEALTH_SENSORS, False):
+        params_coordinator = hass.data[DOMAIN][entry.entry_id]["params_coordinator"]
+        sensors.extend(
+            RainMakerBridgeHealthEntity(params_coordinator, entry, *health_sensor)
+            for health_sensor in BRIDGE_HEALTH_SENSORS
+        )
+
+    async_add_entities(sensors)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+# key, name, unit, state class, icon, value from the client's BridgeMetrics
+BRIDGE_HEALTH_SENSORS = (
+    ("requests", "Bridge Requests", None, SensorStateClass.TOTAL_INCREASING, "mdi:swap-vertical",
+     lambda metrics: metrics.total_requests),
+    ("errors", "Bridge Errors", None, SensorStateClass.TOTAL_INCREASING, "mdi:alert-circle-outline",
+     lambda metrics: metrics.total_errors),
+    ("latency", "Bridge Latency", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT, "mdi:timer-outline",
+     lambda metrics: _ms(metrics.latency_smoothed)),
+    ("in_flight", "Bridge Requests In Flight", None, SensorStateClass.MEASUREMENT, "mdi:progress-upload",
+     lambda metrics: metrics.in_flight),
+    ("poll_duration", "Bridge Poll Duration", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT, "mdi:timer-sand",
+     lambda metrics: _ms(metrics.last_poll_duration("params"))),
+)
+
+def _node_fingerprint(device):
+    """Return a compact tuple of the device fields a status entity renders."""
+    return (device.connected, device.is_matter)
+
+class RainMakerStatusEntity(CoordinatorEntity, SensorEntity):
+    def __init__(self, coordinator, device, device_name):
+        super().__init__(coordinator)
+        # Shared record, updated in place by both coordinators
+        self._device = device
+        self._node_id = device.node_id
+        self._device_name = device_name
 
         self._attr_name = f"{self._device_name} Status"
         self._attr_unique_id = f"esp_rainmaker_status_{self._node_id}"
 
         # Get connectivity status
-        connected = device_data.get("connected", False)
-        self._attr_native_value = "online" if connected else "offline"
+        self._attr_native_value = "online" if device.connected else "offline"
         self._attr_icon = "mdi:wifi"
 
+        # Polls matching the last rendered node record skip the state write
+        self._node_fingerprint = _node_fingerprint(device)
+        self._written_available = None
+
     def _update_device_name_from_light_params(self, node_id):
         """Try to update device name from Light.Name parameter."""
         try:
@@ -103,8 +113,8 @@ class RainMakerStatusEntity(SensorEntity):
             identifiers={(DOMAIN, f"rainmaker_{self._node_id}")},
             name=self._device_name,  # This should match the light entity device name
             manufacturer="Espressif",
-            model=self._device_type,
-            sw_version=self._node_type,
+            model=self._device.type,
+            sw_version=self._device.node_type,
         )
 
     @property
@@ -112,35 +122,84 @@ class RainMakerStatusEntity(SensorEntity):
         """Return additional attributes."""
         return {
             "node_id": self._node_id,
-            "device_type": self._device_type,
-            "node_type": self._node_type,
-            "is_matter": self._device_data.get("is_matter", False),
-            "connected": self._device_data.get("connected", False),
+            "device_type": self._device.type,
+            "node_type": self._device.node_type,
+            "is_matter": self._device.is_matter,
+            "connected": self._device.connected,
         }
 
-    async def async_update(self):
-        try:
-            session = async_get_clientsession(self._hass)
-            async with session.get(f"{self._base_url}/rainmakernodes") as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    devices = data.get("devices", [])
-
-                    # Find this device in the updated data
-                    for device in devices:
-                        if device["node_id"] == self._node_id:
-                            connected = device.get("connected", False)
-                            self._attr_native_value = "online" if connected else "offline"
-
-                            # Update device data for attributes
-                            self._device_data = device
-                            return
-
-                    # Device not found in updated data
-                    self._attr_native_value = "offline"
-                else:
-                    _LOGGER.error(f"Failed to fetch data: HTTP {resp.status}")
-                    self._attr_native_value = "unknown"
-        except Exception as e:
-            _LOGGER.error(f"Error updating RainMaker status entity {self._node_id}: {e}")
-            self._attr_native_value = "unknown"
+    async def async_added_to_hass(self):
+        """Also listen for pushed updates and renames of this node."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_node_listener(self._node_id, self._handle_coordinator_update)
+        )
+        self.async_on_remove(
+            self.hass.data[DOMAIN][self.platform.config_entry.entry_id]["entities"].async_add(self._node_id, self)
+        )
+
+    @callback
+    def async_set_device_name(self, device_name):
+        """Follow a renamed device; returns True if the name changed."""
+        if device_name == self._device_name:
+            return False
+        self._device_name = device_name
+        self._attr_name = f"{device_name} Status"
+        self.async_write_ha_state()
+        return True
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Render this node's record after a node list refresh."""
+        listed = self._node_id in self.coordinator.data
+        fingerprint = _node_fingerprint(self._device) if listed else None
+        if fingerprint == self._node_fingerprint and self.available == self._written_available:
+            return
+        self._node_fingerprint = fingerprint
+
+        # Nodes missing from the list are shown as offline
+        self._attr_native_value = "online" if listed and self._device.connected else "offline"
+
+        self._written_available = self.available
+        super()._handle_coordinator_update()
+
+
+class RainMakerBridgeHealthEntity(CoordinatorEntity, SensorEntity):
+    """Request load, latency or errors of the bridge, refreshed on every params poll tick."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry, key, name, unit, state_class, icon, value_fn):
+        super().__init__(coordinator)
+        self._metrics = coordinator.client.metrics
+        self._value_fn = value_fn
+        self._entry = entry
+
+        self._attr_name = name
+        self._attr_unique_id = f"esp_rainmaker_bridge_{entry.entry_id}_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_icon = icon
+        self._attr_native_value = value_fn(self._metrics)
+
+    @property
+    def available(self):
+        """Metrics are local, so they stay available while the bridge is down."""
+        return True
+
+    @property
+    def device_info(self):
+        return DeviceInfo(
+            identifiers={(DOMAIN, f"bridge_{self._entry.entry_id}")},
+            name=f"ESP RainMaker Bridge {self._entry.data['host']}",
+            manufacturer="Espressif",
+            model="RainMaker Bridge",
+        )
+
+    @callback
+    def _handle_coordinator_update(self):
+        value = self._value_fn(self._metrics)
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        super()._handle_coordinator_update()
@@ -0,0 +1,138 @@
+import asyncio
+from homeassistant.core import HomeAssistant
+from .api import json_loads
+from .exceptions import BridgeUnavailableError, RainMakerUnsupportedError
+from .const import (
+    STREAM_RECONNECT_MIN,
+    STREAM_RECONNECT_MAX,
+    RECONCILE_SCAN_INTERVAL,
+)
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RainMakerEventStream:
+    """Single persistent Server-Sent Events subscription to the bridge.
+
+    The bridge sends one JSON object per event on GET /events, for example
+    {"node_id": "...", "params": {"Light": {"Power": true}}} for param changes or
+    {"node_id": "...", "connected": false} for connectivity changes. Events are
+    merged into the coordinators and delivered to the affected node's entities.
+    While the stream is up, light params drop to a slow reconciliation poll.
+    The node list keeps its normal interval, as the stream does not announce
+    added or removed nodes.
+    """
+
+    def __init__(self, hass: HomeAssistant, client, nodes_coordinator, params_coordinator):
+        self._hass = hass
+        self._client = client
+        self._base_url = client.base_url
+        self._nodes_coordinator = nodes_coordinator
+        self._params_coordinator = params_coordinator
+        self._task = None
+        self.connected = False
+
+    def async_start(self, entry):
+        """Start the background subscription task."""
+        self._task = entry.async_create_background_task(
+            self._hass, self._async_run(), f"esp-rainmaker event stream {self._base_url}"
+        )
+
+    async def async_stop(self):
+        """Stop the subscription and restore normal polling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._set_connected(False)
+
+    async def _async_run(self):
+        """Keep the stream connected, reconnecting with exponential backoff."""
+        delay = STREAM_RECONNECT_MIN
+        while True:
+            try:
+                await self._async_listen()
+            except asyncio.CancelledError:
+                raise
+            except RainMakerUnsupportedError as e:
+                # Retrying cannot help; normal polling carries on
+                _LOGGER.info(f"Bridge at {self._base_url} has no event stream ({e}), staying on polling")
+                return
+            except BridgeUnavailableError as e:
+                _LOGGER.debug(f"Event stream from {self._base_url} paused: {e}")
+            except Exception as e:
+                _LOGGER.warning(f"Event stream from {self._base_url} lost: {e}")
+
+            if self.connected:
+                # Stream was up: resume normal polling and catch up on missed changes
+                self._set_connected(False)
+                delay = STREAM_RECONNECT_MIN
+                await self._params_coordinator.async_request_refresh()
+                await self._nodes_coordinator.async_request_refresh()
+
+            _LOGGER.debug(f"Reconnecting event stream to {self._base_url} in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STREAM_RECONNECT_MAX)
+
+    async def _async_listen(self):
+        """Connect once and apply events until the connection ends."""
+        resp = await self._client.async_open_event_stream()
+        async with resp:
+            _LOGGER.info(f"Subscribed to RainMaker events from {self._base_url}")
+            self._set_connected(True)
+
+            data_lines = []
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8").rstrip("\r\n")
+                if not line:
+                    # Blank line terminates an event
+                    if data_lines:
+                        self._handle_event("\n".join(data_lines))
+                        data_lines = []
+                elif line.startswith("data:"):
+                    data_lines.append(line[5:].lstrip())
+                # Comments (":keepalive") and other SSE fields are ignored
+
+    def _set_connected(self, connected):
+        """Switch the params coordinator between reconciliation and normal polling."""
+        self.connected = connected
+        coordinator = self._params_coordinator
+        if connected:
+            coordinator.async_set_scan_interval(RECONCILE_SCAN_INTERVAL)
+        else:
+            coordinator.async_set_scan_interval(coordinator.scan_interval)
+
+    def _handle_event(self, payload):
+        """Merge one event into the coordinators."""
+        if self._client.recorder is not None:
+            self._client.recorder.record_event(payload)
+
+        try:
+            event = json_loads(payload)
+        except ValueError:
+            _LOGGER.debug(f"Ignoring malformed event from {self._base_url}: {payload}")
+            return
+
+        node_id = event.get("node_id")
+        if not node_id:
+            return
+
+        if "params" in event and self._params_coordinator.data is not None:
+            # Events may only carry the params that changed
+            params = dict(self._params_coordinator.data.get(node_id, {}))
+            for device, values in event["params"].items():
+                params[device] = {**params.get(device, {}), **values}
+            self._params_coordinator.async_update_node(node_id, params)
+
+        if "connected" in event and self._nodes_coordinator.data is not None:
+            device = self._nodes_coordinator.data.get(node_id)
+            if device is not None:
+                self._nodes_coordinator.async_update_node(
+                    node_id, {**device, "connected": event["connected"]}
+                )
+
+        _LOGGER.debug(f"Applied event for {node_id}: {event}")
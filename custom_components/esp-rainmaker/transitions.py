@@ -0,0 +1,152 @@
+import asyncio
+import time
+from homeassistant.core import HomeAssistant, callback
+from .const import (
+    TRANSITION_FRAME_MIN,
+    TRANSITION_FRAME_MAX,
+    TRANSITION_BRIDGE_SHARE,
+)
+from .exceptions import RainMakerCommandError
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Light params that are interpolated during a fade
+FADE_PARAMS = ("Brightness", "Hue", "Saturation")
+
+
+class _Fade:
+    """One light moving from start to target params."""
+
+    __slots__ = ("start", "target", "initial", "final", "started_at", "duration", "last_sent", "sent_at")
+
+    def __init__(self, start, target, initial, final, duration, now):
+        self.start = start
+        self.target = target
+        self.initial = initial
+        self.final = final
+        self.started_at = now
+        self.duration = duration
+        self.last_sent = None
+        self.sent_at = 0.0
+
+    def step(self, now):
+        """Return (params, done) for the current point of the fade."""
+        progress = min(1.0, (now - self.started_at) / self.duration)
+        if progress >= 1.0:
+            return {**self.target, **self.final}, True
+
+        params = {}
+        for key, start in self.start.items():
+            end = self.target[key]
+            if key == "Hue":
+                # Take the short way around the color wheel
+                delta = (end - start + 180) % 360 - 180
+                params[key] = round(start + delta * progress) % 360
+            else:
+                params[key] = round(start + (end - start) * progress)
+        return params, False
+
+
+class TransitionScheduler:
+    """Run light fades for one bridge within a shared frame budget.
+
+    Steps are interpolated locally and sent through each node's command
+    pipeline. Every frame at most a budget of lights get a step; the frame
+    length and budget follow the bridge's measured latency and connection
+    limit, so many simultaneous fades degrade to fewer, larger steps instead
+    of flooding the bridge. Final steps are always sent.
+    """
+
+    def __init__(self, hass: HomeAssistant, params_coordinator):
+        self._hass = hass
+        self._coordinator = params_coordinator
+        self._client = params_coordinator.client
+        self._fades = {}
+        self._task = None
+
+    @callback
+    def async_start(self, node_id, light_data, duration):
+        """Fade a light to light_data over duration seconds, replacing any running fade."""
+        device = self._coordinator.devices.get(node_id)
+        current = {"Brightness": device.brightness, "Hue": device.hue, "Saturation": device.saturation}
+        turning_off = light_data.get("Power") is False
+
+        if turning_off:
+            # Fade down, then switch off with the brightness restored for the next turn on
+            target = {"Brightness": 1}
+            initial = {}
+            final = {"Power": False, "Brightness": device.brightness}
+        else:
+            target = {key: light_data[key] for key in FADE_PARAMS if key in light_data}
+            initial = {} if device.power else {"Power": True}
+            final = light_data
+            if not device.power:
+                # Fade up from dark
+                current["Brightness"] = 1
+
+        start = {key: current[key] for key in target}
+        self._fades[node_id] = _Fade(start, target, initial, final, duration, time.monotonic())
+        if self._task is None:
+            self._task = self._hass.async_create_background_task(
+                self._async_run(), f"rainmaker transitions {self._client.base_url}"
+            )
+
+    @callback
+    def async_cancel(self, node_id):
+        """Stop a running fade, e.g. because a new command was issued for the light."""
+        self._fades.pop(node_id, None)
+
+    @callback
+    def async_shutdown(self):
+        self._fades.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _frame(self):
+        """Return (frame length, steps per frame) for the bridge's current latency."""
+        latency = self._client.metrics.latency_smoothed or TRANSITION_FRAME_MIN
+        frame = min(TRANSITION_FRAME_MAX, max(TRANSITION_FRAME_MIN, latency))
+        per_second = self._client.max_concurrency / max(latency, 0.001)
+        return frame, max(1, int(per_second * frame * TRANSITION_BRIDGE_SHARE))
+
+    async def _async_run(self):
+        try:
+            while self._fades:
+                frame, budget = self._frame()
+                now = time.monotonic()
+
+                steps = []
+                for node_id, fade in self._fades.items():
+                    params, done = fade.step(now)
+                    if fade.last_sent is not None:
+                        params = {key: value for key, value in params.items() if fade.last_sent.get(key) != value}
+                    if params or done:
+                        steps.append((not done, fade.sent_at, node_id, fade, params, done))
+
+                # Finishing fades first, then the lights that waited longest
+                steps.sort(key=lambda step: step[:2])
+                for index, (_, _, node_id, fade, params, done) in enumerate(steps):
+                    if index >= budget and not done:
+                        break
+                    if fade.last_sent is None:
+                        params = {**fade.initial, **params}
+                    fade.last_sent = {**(fade.last_sent or {}), **params}
+                    fade.sent_at = now
+                    if done:
+                        del self._fades[node_id]
+                    if params:
+                        self._hass.async_create_task(self._async_send_step(node_id, fade, params))
+
+                await asyncio.sleep(frame)
+        finally:
+            self._task = None
+
+    async def _async_send_step(self, node_id, fade, params):
+        try:
+            await self._coordinator.command_pipeline(node_id).async_send(params)
+        except RainMakerCommandError as e:
+            if self._fades.get(node_id) is fade:
+                _LOGGER.warning(f"Stopping transition of {node_id}: {e}")
+                del self._fades[node_id]
@@ -0,0 +1,60 @@
+import asyncio
+import importlib
+import types
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+scheduler = importlib.import_module("custom_components.esp-rainmaker.scheduler")
+
+
+async def _run(bridge, priority=scheduler.PRIORITY_POLL):
+    async with bridge.slot(priority):
+        pass
+
+
+def test_request_waits_for_refill_with_nothing_in_flight():
+    async def main():
+        bridge = scheduler.BridgeRequestScheduler(max_in_flight=4, rate_limit=10)
+        # Spend the burst so the bucket is empty and nothing is in flight
+        for _ in range(10):
+            await _run(bridge)
+        assert bridge.in_flight == 0
+        await asyncio.wait_for(_run(bridge), timeout=1)
+        assert bridge.started == 11
+
+    asyncio.run(main())
+
+
+def test_cancelled_request_leaves_queue_under_domain_scheduler():
+    async def main():
+        hass = types.SimpleNamespace(loop=asyncio.get_running_loop())
+        domain = scheduler.DomainScheduler(hass, max_in_flight=2)
+        bridge = scheduler.BridgeRequestScheduler(max_in_flight=4)
+        domain.async_add_bridge("entry", bridge)
+
+        # Polls get one global slot out of two; hold it and queue another
+        release = asyncio.Event()
+
+        async def hold():
+            async with bridge.slot(scheduler.PRIORITY_POLL):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(_run(bridge))
+        await asyncio.sleep(0)
+        assert bridge.queued == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert bridge._waiters == []
+
+        release.set()
+        await holder
+        await asyncio.wait_for(_run(bridge), timeout=1)
+        assert domain.in_flight == 0
+
+    asyncio.run(main())
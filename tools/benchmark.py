@@ -0,0 +1,316 @@
+"""Scale benchmark for the ESP RainMaker integration.
+
+Boots a throwaway Home Assistant instance with this integration installed,
+points it at a simulated bridge (tools/fake_bridge.py, run in a separate
+process so its CPU time is not counted) and reports for each fleet size:
+
+    setup      time from adding the config entry until every light exists
+    req/min    bridge requests per minute while idling (polling only)
+    cpu        Home Assistant process CPU time per wall second while idling
+    loop lag   p50/p99 scheduling delay of a 100 ms probe timer
+    ack        light.turn_on service call until the command returned
+    confirm    light.turn_on until a read-back from the bridge shows the change
+
+Requires Home Assistant in the current environment:
+
+    python tools/benchmark.py --nodes 10,100,1000 --duration 60 --latency 50
+
+With --replay the bridge is tools/replay_bridge.py serving a capture from the
+start_capture service instead; --nodes then lists how many copies of the
+captured fleet to serve:
+
+    python tools/benchmark.py --replay capture.jsonl --nodes 1,10 --speed 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTEGRATION = os.path.join(ROOT, "custom_components", "esp-rainmaker")
+FAKE_BRIDGE = os.path.join(ROOT, "tools", "fake_bridge.py")
+REPLAY_BRIDGE = os.path.join(ROOT, "tools", "replay_bridge.py")
+DOMAIN = "esp-rainmaker"
+
+
+def _percentile(values, percent):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class LoopMonitor:
+    """Measure event loop responsiveness with a periodic probe timer."""
+
+    def __init__(self, loop, interval=0.1):
+        self._loop = loop
+        self._interval = interval
+        self._task = None
+        self.lags = []
+
+    def start(self):
+        self._task = self._loop.create_task(self._probe())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _probe(self):
+        while True:
+            expected = self._loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.lags.append(max(0.0, self._loop.time() - expected))
+
+
+async def _start_bridge(args, nodes, port):
+    """Start the fake or replay bridge in its own process and wait until it answers."""
+    if args.replay:
+        command = [
+            sys.executable, REPLAY_BRIDGE, args.replay,
+            "--copies", str(nodes),
+            "--port", str(port),
+            "--speed", str(args.speed),
+            "--latency-scale", str(args.latency_scale),
+            "--seed", "1",
+        ]
+    else:
+        command = [
+            sys.executable, FAKE_BRIDGE,
+            "--nodes", str(nodes),
+            "--port", str(port),
+            "--latency", str(args.latency),
+            "--jitter", str(args.jitter),
+            "--failure-rate", str(args.failure_rate),
+            "--offline-rate", str(args.offline_rate),
+            "--seed", "1",
+        ] + (["--no-bulk"] if args.no_bulk else [])
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(f"http://127.0.0.1:{port}/_stats") as resp:
+                    if resp.status == 200:
+                        return proc
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("Fake bridge did not start")
+
+
+async def _bridge_stats(port, reset=False):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            f"http://127.0.0.1:{port}/_stats", params={"reset": "1"} if reset else None
+        ) as resp:
+            return await resp.json()
+
+
+async def _start_hass(config_dir):
+    """Boot a minimal Home Assistant with the integration installed."""
+    from homeassistant import bootstrap
+    from homeassistant.runner import RuntimeConfig
+
+    os.makedirs(os.path.join(config_dir, "custom_components"))
+    shutil.copytree(INTEGRATION, os.path.join(config_dir, "custom_components", DOMAIN))
+    with open(os.path.join(config_dir, "configuration.yaml"), "w") as config:
+        config.write("homeassistant:\n  name: benchmark\n")
+
+    hass = await bootstrap.async_setup_hass(RuntimeConfig(config_dir=config_dir))
+    if hass is None:
+        raise RuntimeError("Home Assistant failed to start")
+    await hass.async_start()
+    return hass
+
+
+async def _wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def _run_one(args, nodes, port):
+    from homeassistant.helpers import entity_registry as er
+
+    proc = await _start_bridge(args, nodes, port)
+    config_dir = tempfile.mkdtemp(prefix="rainmaker-bench-")
+    hass = None
+    monitor = None
+    try:
+        hass = await _start_hass(config_dir)
+        monitor = LoopMonitor(hass.loop)
+        monitor.start()
+
+        # Setup: config flow -> async_setup_entry -> platforms -> all lights created
+        started = time.perf_counter()
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": "user"},
+            data={
+                "host": "127.0.0.1",
+                "port": port,
+                "push_updates": args.push_updates,
+            },
+        )
+        if result.get("step_id") != "tuning":
+            raise RuntimeError(f"Config flow stopped before tuning: {result.get('errors')}")
+        # Keep the probed poll interval and rate limit; only the concurrency is fixed
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {"max_concurrency": args.max_concurrency}
+        )
+        entry = result["result"]
+        await hass.async_block_till_done()
+        registry = er.async_get(hass)
+        await _wait_for(
+            lambda: len([
+                e for e in er.async_entries_for_config_entry(registry, entry.entry_id)
+                if e.domain == "light"
+            ]) >= len(hass.data[DOMAIN][entry.entry_id]["params_coordinator"].node_ids),
+            timeout=300,
+        )
+        setup_time = time.perf_counter() - started
+
+        # Steady state: polling only
+        await _bridge_stats(port, reset=True)
+        monitor.lags.clear()
+        cpu_started = time.process_time()
+        idle_started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        idle_elapsed = time.perf_counter() - idle_started
+        stats = await _bridge_stats(port)
+        idle_cpu = time.process_time() - cpu_started
+        idle_lags = list(monitor.lags)
+
+        # Commands through light.turn_on -> _send_command -> pipeline -> read-back
+        params_coordinator = hass.data[DOMAIN][entry.entry_id]["params_coordinator"]
+        lights = {
+            e.unique_id.removeprefix("esp_rainmaker_light_"): e.entity_id
+            for e in er.async_entries_for_config_entry(registry, entry.entry_id)
+            if e.domain == "light"
+        }
+        sample = random.sample(sorted(lights), min(args.commands, len(lights)))
+
+        # Accepted params are written optimistically before turn_on returns, so
+        # note when each node's confirming read-back has actually landed
+        read_back_at = {}
+        refresh_nodes = params_coordinator.async_refresh_nodes
+
+        async def _refresh_nodes(node_ids, confirm=False):
+            await refresh_nodes(node_ids, confirm)
+            if confirm:
+                now = time.perf_counter()
+                for node_id in node_ids:
+                    read_back_at.setdefault(node_id, now)
+
+        params_coordinator.async_refresh_nodes = _refresh_nodes
+
+        async def _command(node_id):
+            current = params_coordinator.data.get(node_id, {}).get("Light", {}).get("Brightness")
+            value = random.choice([v for v in range(3, 256) if int(v * 100 / 255) != current])
+            # The light converts HA's 0-255 brightness to RainMaker's 0-100
+            brightness = int(value * 100 / 255)
+            started = time.perf_counter()
+            await hass.services.async_call(
+                "light",
+                "turn_on",
+                {"entity_id": lights[node_id], "brightness": value},
+                blocking=True,
+            )
+            ack = time.perf_counter() - started
+            read_back_at.pop(node_id, None)
+
+            def _confirmed():
+                if node_id not in read_back_at:
+                    return False
+                light = (params_coordinator.data or {}).get(node_id, {}).get("Light", {})
+                return light.get("Brightness") == brightness and light.get("Power") is True
+
+            # Confirmed once the batched read-back after the command shows the change
+            ok = await _wait_for(_confirmed, timeout=30)
+            return ack, (read_back_at[node_id] - started) if ok else None
+
+        results = await asyncio.gather(*(_command(node_id) for node_id in sample))
+        acks = [ack for ack, _ in results]
+        confirms = [confirm for _, confirm in results if confirm is not None]
+
+        return {
+            "nodes": len(hass.data[DOMAIN][entry.entry_id]["coordinator"].data),
+            "setup": setup_time,
+            "rpm": stats["total"] / idle_elapsed * 60,
+            "cpu": idle_cpu / idle_elapsed,
+            "lag_p50": _percentile(idle_lags, 50),
+            "lag_p99": _percentile(idle_lags, 99),
+            "ack_p50": _percentile(acks, 50),
+            "ack_p99": _percentile(acks, 99),
+            "confirm_p50": _percentile(confirms, 50),
+            "confirm_p99": _percentile(confirms, 99),
+            "unconfirmed": len(results) - len(confirms),
+        }
+    finally:
+        if monitor is not None:
+            monitor.stop()
+        if hass is not None:
+            await hass.async_stop(force=True)
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+def _print_results(results):
+    header = (
+        f"{'nodes':>6} {'setup s':>8} {'req/min':>8} {'cpu %':>6} "
+        f"{'lag p50/p99 ms':>15} {'ack p50/p99 ms':>15} {'confirm p50/p99 ms':>19} {'lost':>5}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['nodes']:>6} {r['setup']:>8.2f} {r['rpm']:>8.0f} {r['cpu'] * 100:>6.1f} "
+            f"{r['lag_p50'] * 1000:>7.1f}/{r['lag_p99'] * 1000:<7.1f} "
+            f"{r['ack_p50'] * 1000:>7.0f}/{r['ack_p99'] * 1000:<7.0f} "
+            f"{r['confirm_p50'] * 1000:>9.0f}/{r['confirm_p99'] * 1000:<9.0f} {r['unconfirmed']:>5}"
+        )
+
+
+async def _main(args):
+    results = []
+    for nodes in args.nodes:
+        label = f"{nodes} copies of {args.replay}" if args.replay else f"{nodes} nodes"
+        print(f"Benchmarking {label}...", file=sys.stderr, flush=True)
+        results.append(await _run_one(args, nodes, args.port))
+    _print_results(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", default="10,100,1000", help="comma separated fleet sizes (copies with --replay)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of idle polling to measure")
+    parser.add_argument("--commands", type=int, default=20, help="lights commanded per fleet size")
+    parser.add_argument("--latency", type=float, default=50, help="bridge latency in ms")
+    parser.add_argument("--jitter", type=float, default=20, help="bridge latency jitter in ms")
+    parser.add_argument("--failure-rate", type=float, default=0)
+    parser.add_argument("--offline-rate", type=float, default=0)
+    parser.add_argument("--no-bulk", action="store_true", help="simulate a bridge without bulk endpoints")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--push-updates", action="store_true")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--replay", metavar="CAPTURE", help="serve a traffic capture instead of a simulated fleet")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay outside changes this many times faster")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply captured latencies")
+    args = parser.parse_args()
+    args.nodes = [int(n) for n in args.nodes.split(",")]
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
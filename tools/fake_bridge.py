@@ -0,0 +1,268 @@
+"""Local ESP RainMaker bridge simulator for scale testing.
+
+Serves the endpoints the integration uses with a configurable fleet size,
+latency, jitter and failure rate:
+
+    GET  /rainmakernodes
+    GET  /nodedetails/{node_id}
+    GET  /getparams/{node_id}
+    GET  /getparams?node_ids=a,b,c      (bulk, disable with --no-bulk)
+    POST /setparams/{node_id}
+    POST /setparams                     (bulk, disable with --no-bulk)
+    GET  /events                        (Server-Sent Events)
+    GET  /_stats                        (request counters, ?reset=1 to clear)
+
+Run it standalone:
+
+    python tools/fake_bridge.py --nodes 200 --latency 150 --jitter 50
+
+then add the integration with host 127.0.0.1 and the chosen port.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+class FakeBridge:
+    """In-memory fleet of RainMaker lights behind an aiohttp server."""
+
+    def __init__(
+        self,
+        nodes=100,
+        latency=0.0,
+        jitter=0.0,
+        failure_rate=0.0,
+        offline_rate=0.0,
+        change_rate=0.0,
+        bulk=True,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.change_rate = change_rate
+        self.bulk = bulk
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._subscribers = set()
+        self._runner = None
+        self._change_task = None
+
+        self.nodes = {}
+        for index in range(nodes):
+            node_id = f"fake{index:06d}{self._random.getrandbits(32):08x}"
+            self.nodes[node_id] = {
+                "node_id": node_id,
+                "name": f"Fake Light {index}",
+                "type": "Lightbulb",
+                "node_type": "rainmaker",
+                "connected": self._random.random() >= offline_rate,
+                "is_matter": False,
+                "model": "fake-light",
+                "fw_version": "1.0.0",
+                "params": {
+                    "Light": {
+                        "Name": f"Fake Light {index}",
+                        "Power": self._random.random() < 0.5,
+                        "Brightness": self._random.randint(1, 100),
+                        "Hue": self._random.randint(0, 360),
+                        "Saturation": self._random.randint(0, 100),
+                    }
+                },
+            }
+
+    def build_app(self):
+        """Create the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/rainmakernodes", self._handle_nodes)
+        app.router.add_get("/nodedetails/{node_id}", self._handle_node_details)
+        app.router.add_get("/getparams", self._handle_get_params_bulk)
+        app.router.add_get("/getparams/{node_id}", self._handle_get_params)
+        app.router.add_post("/setparams", self._handle_set_params_bulk)
+        app.router.add_post("/setparams/{node_id}", self._handle_set_params)
+        app.router.add_get("/events", self._handle_events)
+        app.router.add_get("/_stats", self._handle_stats)
+        return app
+
+    async def start(self, host="127.0.0.1", port=8100):
+        """Start serving; returns the bound port."""
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        if self.change_rate > 0:
+            self._change_task = asyncio.create_task(self._simulate_changes())
+        return site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop serving."""
+        if self._change_task is not None:
+            self._change_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if request.path == "/_stats":
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        endpoint = resource.canonical if resource is not None else request.path
+        self.requests[f"{request.method} {endpoint}"] += 1
+
+        delay = self._delay(request.method, endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._fails(request.method, endpoint):
+            return web.json_response({"error": "simulated failure"}, status=500)
+        return await handler(request)
+
+    def _delay(self, method, endpoint):
+        """Return how long to hold a request to endpoint (the route pattern) before answering."""
+        return self.latency + self._random.uniform(-self.jitter, self.jitter)
+
+    def _fails(self, method, endpoint):
+        """Return True if this request should be answered with HTTP 500."""
+        return self._random.random() < self.failure_rate
+
+    def _node_or_404(self, request):
+        node = self.nodes.get(request.match_info["node_id"])
+        if node is None:
+            raise web.HTTPNotFound()
+        return node
+
+    async def _handle_nodes(self, request):
+        fields = ("node_id", "name", "type", "node_type", "connected", "is_matter")
+        devices = [{key: node[key] for key in fields} for node in self.nodes.values()]
+        return web.json_response({"devices": devices})
+
+    async def _handle_node_details(self, request):
+        node = self._node_or_404(request)
+        detail = {
+            "name": node["name"],
+            "model": node["model"],
+            "fw_version": node["fw_version"],
+            "params": node["params"],
+        }
+        return web.json_response({"details": {"node_details": [detail]}})
+
+    async def _handle_get_params(self, request):
+        node = self._node_or_404(request)
+        return web.json_response({"params": node["params"]})
+
+    async def _handle_get_params_bulk(self, request):
+        if not self.bulk:
+            raise web.HTTPNotFound()
+        node_ids = [node_id for node_id in request.query.get("node_ids", "").split(",") if node_id]
+        return web.json_response({"nodes": [
+            {"node_id": node_id, "params": self.nodes[node_id]["params"]}
+            for node_id in node_ids
+            if node_id in self.nodes
+        ]})
+
+    async def _handle_set_params(self, request):
+        node = self._node_or_404(request)
+        payload = await request.json()
+        self._apply(node, payload)
+        return web.json_response({"success": True})
+
+    async def _handle_set_params_bulk(self, request):
+        if not self.bulk:
+            raise web.HTTPNotFound()
+        payload = await request.json()
+        for node_id in payload.get("node_ids", []):
+            if node_id in self.nodes:
+                self._apply(self.nodes[node_id], payload.get("params", {}))
+        return web.json_response({"success": True})
+
+    async def _handle_events(self, request):
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                    await resp.write(f"data: {json.dumps(event)}\n\n".encode())
+                except asyncio.TimeoutError:
+                    await resp.write(b":keepalive\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subscribers.discard(queue)
+        return resp
+
+    async def _handle_stats(self, request):
+        stats = {"requests": dict(self.requests), "total": sum(self.requests.values())}
+        if request.query.get("reset"):
+            self.requests.clear()
+        return web.json_response(stats)
+
+    def _apply(self, node, params):
+        """Apply a setparams payload and notify event subscribers."""
+        for device, values in params.items():
+            node["params"].setdefault(device, {}).update(values)
+        self._publish({"node_id": node["node_id"], "params": params})
+
+    def _publish(self, event):
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    async def _simulate_changes(self):
+        """Flip random lights as if someone used a physical switch."""
+        node_ids = list(self.nodes)
+        while True:
+            await asyncio.sleep(self._random.expovariate(self.change_rate))
+            node = self.nodes[self._random.choice(node_ids)]
+            self._apply(node, {"Light": {"Power": not node["params"]["Light"]["Power"]}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--nodes", type=int, default=100, help="number of simulated lights")
+    parser.add_argument("--latency", type=float, default=0, help="mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="latency jitter (+/-) in ms")
+    parser.add_argument("--failure-rate", type=float, default=0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--offline-rate", type=float, default=0, help="fraction of nodes reported as disconnected")
+    parser.add_argument("--change-rate", type=float, default=0, help="simulated physical switch changes per second")
+    parser.add_argument("--no-bulk", action="store_true", help="disable the bulk getparams/setparams endpoints")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    bridge = FakeBridge(
+        nodes=args.nodes,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        failure_rate=args.failure_rate,
+        offline_rate=args.offline_rate,
+        change_rate=args.change_rate,
+        bulk=not args.no_bulk,
+        seed=args.seed,
+    )
+
+    async def _run():
+        port = await bridge.start(args.host, args.port)
+        print(f"Fake bridge with {args.nodes} nodes listening on http://{args.host}:{port}", flush=True)
+        started = time.monotonic()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await bridge.stop()
+            print(f"Served {sum(bridge.requests.values())} requests in {time.monotonic() - started:.0f}s")
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
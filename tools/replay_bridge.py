@@ -0,0 +1,277 @@
+"""Replay a traffic capture of a real bridge for reproducible performance tests.
+
+Captures are JSON lines files written by the esp-rainmaker.start_capture and
+esp-rainmaker.stop_capture services. The replay bridge rebuilds the captured
+fleet (node list, node details and params) and serves it on the same
+endpoints as tools/fake_bridge.py, so any version of the integration can be
+pointed at it:
+
+    - response latency is sampled from the captured round trips per endpoint,
+      scaled by --latency-scale
+    - each endpoint fails as often as it did in the capture
+    - changes made outside Home Assistant (pushed events, reads that differ
+      from the previous read without a command in between, nodes going
+      offline) happen at their captured offsets, divided by --speed, and are
+      pushed to /events subscribers
+    - --copies N serves N copies of the fleet under suffixed node IDs
+
+Requests are counted per endpoint on /_stats, so request counts and latencies
+of two versions can be compared on the same capture:
+
+    python tools/replay_bridge.py capture.jsonl --speed 4 --copies 10
+"""
+import argparse
+import asyncio
+import copy
+import json
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+from fake_bridge import FakeBridge
+
+# Route patterns of the bridge mapped to the endpoint names in captures
+ROUTE_ENDPOINTS = {
+    ("GET", "/rainmakernodes"): "rainmakernodes",
+    ("GET", "/nodedetails/{node_id}"): "nodedetails",
+    ("GET", "/getparams"): "getparams_bulk",
+    ("GET", "/getparams/{node_id}"): "getparams",
+    ("POST", "/setparams"): "setparams_bulk",
+    ("POST", "/setparams/{node_id}"): "setparams",
+}
+NODE_FIELDS = ("name", "type", "node_type", "connected", "is_matter")
+UNSUPPORTED_STATUSES = (404, 405, 501)
+# A read that differs this soon after a command to the node is its effect, not an outside change
+COMMAND_WINDOW = 15
+
+
+def load_capture(path):
+    """Return the records of a capture file in time order."""
+    with open(path, encoding="utf-8") as capture:
+        records = [json.loads(line) for line in capture if line.strip()]
+    return sorted(records, key=lambda record: record["t"])
+
+
+class ReplayBridge(FakeBridge):
+    """FakeBridge whose fleet, latencies, failures and outside changes come from a capture."""
+
+    def __init__(self, records, speed=1.0, latency_scale=1.0, copies=1, seed=None):
+        super().__init__(nodes=0, seed=seed)
+        self.speed = speed
+        self.latency_scale = latency_scale
+        self._latencies = defaultdict(list)
+        self._outcomes = defaultdict(lambda: [0, 0])
+        self._details = {}
+        self._timeline = []
+        # Params as of the capture offset being loaded; nodes keep the initial state
+        self._current = {}
+        self._load(records)
+        if copies > 1:
+            self._copy_fleet(copies)
+
+    def _node(self, node_id):
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = self.nodes[node_id] = {
+                "node_id": node_id,
+                "name": node_id,
+                "type": "Lightbulb",
+                "node_type": "rainmaker",
+                "connected": True,
+                "is_matter": False,
+                "model": "Unknown",
+                "fw_version": "Unknown",
+                "params": {},
+            }
+        return node
+
+    def _load(self, records):
+        commanded = {}
+        connected_now = {}
+        for record in records:
+            t = record["t"]
+            if "event" in record:
+                event = record["event"]
+                node_id = event.get("node_id")
+                if node_id and t - commanded.get(node_id, float("-inf")) >= COMMAND_WINDOW:
+                    self._add_change(t, event)
+                continue
+
+            endpoint = record["endpoint"]
+            outcome = self._outcomes[endpoint]
+            outcome[0] += 1
+            status = record["status"]
+            if status is not None:
+                self._latencies[endpoint].append(record["duration"])
+            if status in UNSUPPORTED_STATUSES and endpoint.endswith("_bulk"):
+                self.bulk = False
+                outcome[0] -= 1
+                continue
+            if status != 200:
+                outcome[1] += 1
+                continue
+
+            body = record["body"]
+            if endpoint == "rainmakernodes":
+                for device in body.get("devices", []):
+                    node_id = device["node_id"]
+                    node = self._node(node_id)
+                    connected = device.get("connected", True)
+                    if node_id not in connected_now:
+                        node["connected"] = connected
+                    elif connected_now[node_id] != connected:
+                        self._timeline.append((t, {"node_id": node_id, "connected": connected}))
+                    connected_now[node_id] = connected
+                    node.update({key: device[key] for key in NODE_FIELDS if key != "connected" and key in device})
+            elif endpoint == "nodedetails":
+                node_id = record["path"].rsplit("/", 1)[1]
+                node_details = body.get("details", {}).get("node_details", [])
+                self._details[node_id] = node_details
+                node = self._node(node_id)
+                for node_detail in node_details:
+                    node["model"] = node_detail.get("model", node["model"])
+                    node["fw_version"] = node_detail.get("fw_version", node["fw_version"])
+                    for device, values in node_detail.get("params", {}).items():
+                        if device not in node["params"]:
+                            node["params"][device] = dict(values)
+                            self._current.setdefault(node_id, {})[device] = dict(values)
+            elif endpoint in ("getparams", "getparams_bulk"):
+                if endpoint == "getparams":
+                    reads = [(record["path"].rsplit("/", 1)[1], body.get("params", {}))]
+                else:
+                    reads = [(node["node_id"], node.get("params", {})) for node in body.get("nodes", [])]
+                for node_id, params in reads:
+                    self._add_read(t, node_id, params, commanded)
+            elif endpoint == "setparams":
+                commanded[record["path"].rsplit("/", 1)[1]] = t
+            elif endpoint == "setparams_bulk":
+                for node_id in (record["json"] or {}).get("node_ids", []):
+                    commanded[node_id] = t
+
+    def _add_read(self, t, node_id, params, commanded):
+        """Seed a node's params from its first read and turn later outside changes into events."""
+        node = self._node(node_id)
+        if not node["params"]:
+            node["params"] = copy.deepcopy(params)
+            self._current[node_id] = copy.deepcopy(params)
+            return
+        if t - commanded.get(node_id, float("-inf")) < COMMAND_WINDOW:
+            # The effect of a command, which the replayed integration sends itself
+            for device, values in params.items():
+                self._current.setdefault(node_id, {}).setdefault(device, {}).update(values)
+            return
+        current = self._current.setdefault(node_id, {})
+        changed = {}
+        for device, values in params.items():
+            diff = {
+                key: value for key, value in values.items()
+                if current.get(device, {}).get(key) != value
+            }
+            if diff:
+                changed[device] = diff
+        if changed:
+            self._add_change(t, {"node_id": node_id, "params": changed})
+
+    def _add_change(self, t, event):
+        """Schedule an outside change at capture offset t."""
+        for device, values in event.get("params", {}).items():
+            self._current.setdefault(event["node_id"], {}).setdefault(device, {}).update(values)
+        self._timeline.append((t, event))
+
+    def _copy_fleet(self, copies):
+        originals = list(self.nodes.values())
+        timeline = list(self._timeline)
+        for index in range(1, copies):
+            for node in originals:
+                clone = copy.deepcopy(node)
+                clone["node_id"] = f"{node['node_id']}-{index}"
+                self.nodes[clone["node_id"]] = clone
+                if node["node_id"] in self._details:
+                    self._details[clone["node_id"]] = self._details[node["node_id"]]
+            for t, event in timeline:
+                self._timeline.append((t, {**event, "node_id": f"{event['node_id']}-{index}"}))
+        self._timeline.sort(key=lambda item: item[0])
+
+    async def start(self, host="127.0.0.1", port=8100):
+        port = await super().start(host, port)
+        self._change_task = asyncio.create_task(self._replay_timeline())
+        return port
+
+    def _delay(self, method, endpoint):
+        latencies = self._latencies.get(ROUTE_ENDPOINTS.get((method, endpoint)))
+        if not latencies:
+            return 0.0
+        return self._random.choice(latencies) * self.latency_scale
+
+    def _fails(self, method, endpoint):
+        requests, failures = self._outcomes.get(ROUTE_ENDPOINTS.get((method, endpoint)), (0, 0))
+        return bool(failures) and self._random.random() < failures / requests
+
+    async def _handle_node_details(self, request):
+        node_details = self._details.get(request.match_info["node_id"])
+        if node_details is None:
+            return await super()._handle_node_details(request)
+        # Serve the current params with the captured details
+        params = self.nodes[request.match_info["node_id"]]["params"]
+        node_details = [{**node_detail, "params": params} for node_detail in node_details]
+        return web.json_response({"details": {"node_details": node_details}})
+
+    async def _replay_timeline(self):
+        """Apply the captured outside changes at their (sped up) offsets."""
+        started = time.monotonic()
+        for t, event in self._timeline:
+            delay = t / self.speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            node = self.nodes.get(event["node_id"])
+            if node is None:
+                continue
+            if "connected" in event:
+                node["connected"] = event["connected"]
+                self._publish({"node_id": node["node_id"], "connected": event["connected"]})
+            if "params" in event:
+                self._apply(node, event["params"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="JSON lines capture from the start_capture service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay outside changes this many times faster")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply captured latencies")
+    parser.add_argument("--copies", type=int, default=1, help="serve this many copies of the captured fleet")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    bridge = ReplayBridge(
+        load_capture(args.capture),
+        speed=args.speed,
+        latency_scale=args.latency_scale,
+        copies=args.copies,
+        seed=args.seed,
+    )
+
+    async def _run():
+        port = await bridge.start(args.host, args.port)
+        print(
+            f"Replaying {len(bridge.nodes)} nodes and {len(bridge._timeline)} changes "
+            f"on http://{args.host}:{port}",
+            flush=True,
+        )
+        started = time.monotonic()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await bridge.stop()
+            print(f"Served {sum(bridge.requests.values())} requests in {time.monotonic() - started:.0f}s")
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()